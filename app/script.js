@@ -31,6 +31,54 @@ function get_unicodes(chars) {
   return [cout, unilinks, unicodes];
 }
 
+/* The data is loaded lazily from the shards listed in data/index.json, see
+ * `clts _make_app_data`. Loaded graphemes are added to BIPA. */
+var BIPA = {};
+var normalize = {};
+var CLTS_DATA = {index: null, shards: {}};
 
+function loadJSON(url) {
+  return fetch(url).then(function (response) {return response.json();});
+}
 
+function shardKey(segment) {
+  return segment.length ? segment.codePointAt(0).toString(16) : '0';
+}
 
+function normalizeSegment(segment) {
+  var normalized = '';
+  for (var i=0, c; c=segment[i]; i++) {
+    normalized += (c in normalize) ? normalize[c] : c;
+  }
+  return normalized;
+}
+
+/* load the shards containing the segments and their normalized forms */
+function loadSegments(segments) {
+  if (!CLTS_DATA.index) {
+    CLTS_DATA.index = loadJSON('data/index.json').then(function (index) {
+      normalize = index.normalize;
+      return index;
+    });
+  }
+  return CLTS_DATA.index.then(function (index) {
+    var shards = [];
+    segments.forEach(function (segment) {
+      [segment, normalizeSegment(segment)].forEach(function (s) {
+        var key = shardKey(s);
+        if (key in index.shards) {
+          if (!(key in CLTS_DATA.shards)) {
+            CLTS_DATA.shards[key] = loadJSON('data/' + index.shards[key]).then(
+              function (shard) {
+                for (var grapheme in shard.graphemes) {
+                  BIPA[grapheme] = shard.sounds[shard.graphemes[grapheme]];
+                }
+              });
+          }
+          shards.push(CLTS_DATA.shards[key]);
+        }
+      });
+    });
+    return Promise.all(shards);
+  });
+}
@@ -0,0 +1,54 @@
+# coding: utf8
+"""
+Measure the peak memory used by writing the data tables with the `dump` command.
+
+Usage: python benchmarks/dump_memory.py [--cached]
+
+With --cached, the dump is run twice and the second run - re-using all cached
+slices - is measured.
+"""
+from __future__ import unicode_literals, print_function, division
+import sys
+import shutil
+import resource
+import tempfile
+import tracemalloc
+
+from clldutils.path import Path
+
+from pyclts.api import CLTS
+from pyclts.dump import Dump
+
+
+def main(cached=False):
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        tmp.joinpath('data').mkdir()
+        repos = CLTS(str(tmp))
+        # Load all systems before measuring, so that only the dump itself is measured:
+        for systems in [
+            repos.iter_transcriptiondata(),
+            repos.iter_soundclass(),
+            repos.iter_transcriptionsystem(),
+        ]:
+            list(systems)
+        dump = Dump(repos, directory=str(tmp / 'cache'))
+        if cached:
+            dump.write()
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        tracemalloc.start()
+        dump.write()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print('{0} slices computed'.format(len(dump.computed)))
+        print('peak traced memory: {0:.1f}MB'.format(peak / 1024 ** 2))
+        print('peak RSS: {0:.1f}MB (+{1:.1f}MB during dump)'.format(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) / 1024))
+    finally:
+        shutil.rmtree(str(tmp))
+
+
+if __name__ == '__main__':
+    main(cached='--cached' in sys.argv)
@@ -0,0 +1,57 @@
+# coding: utf8
+"""
+Compare the prefix tree used to find base sounds in TranscriptionSystem._parse with
+the alternation regex it replaced.
+
+Usage: python benchmarks/segmenter.py
+"""
+from __future__ import unicode_literals, print_function, division
+import re
+import timeit
+from itertools import islice
+
+from clldutils.path import Path
+from clldutils.dsv import reader
+
+from pyclts import TranscriptionSystem
+from pyclts.util import nfd
+
+TEST_DATA = Path(__file__).parent.parent / 'tests' / 'data' / 'test_data.tsv'
+
+
+def main(number=20):
+    bipa = TranscriptionSystem('bipa')
+    regex = re.compile('|'.join(
+        map(re.escape, sorted(bipa.sounds, key=lambda x: len(x), reverse=True))))
+    rows = list(reader(TEST_DATA, delimiter='\t', dicts=True))
+    inputs = [
+        ('generated', [nfd(r['source']) for r in rows if r['generated']]),
+        ('unknown', [nfd(r['source']) for r in rows if r['type'] == 'unknownsound']),
+        ('unknown (long)', [nfd(r['source']) * 10 for r in rows]),
+    ]
+
+    for label, strings in inputs:
+        # Make sure both matchers find the same spans:
+        for s in strings:
+            assert [m.span() for m in regex.finditer(s)] == list(bipa._trie.finditer(s))
+
+        t_regex = timeit.timeit(
+            lambda: [list(islice(regex.finditer(s), 3)) for s in strings], number=number)
+        t_trie = timeit.timeit(
+            lambda: [list(islice(bipa._trie.finditer(s), 3)) for s in strings],
+            number=number)
+        print('{0:<16} {1:>5} strings  regex: {2:8.2f}us  trie: {3:8.2f}us'.format(
+            label,
+            len(strings),
+            t_regex / number / len(strings) * 1e6,
+            t_trie / number / len(strings) * 1e6))
+
+    compile_time = timeit.timeit(
+        lambda: (re.purge(), re.compile(regex.pattern)), number=number) / number
+    build_time = timeit.timeit(bipa._update_trie, number=number) / number
+    print('setup            regex: {0:.2f}ms  trie: {1:.2f}ms'.format(
+        compile_time * 1e3, build_time * 1e3))
+
+
+if __name__ == '__main__':
+    main()
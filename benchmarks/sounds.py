@@ -0,0 +1,36 @@
+# coding: utf8
+"""
+Time set and dict operations over sound objects, which hash and compare sounds by name.
+
+Usage: python benchmarks/sounds.py
+"""
+from __future__ import unicode_literals, print_function, division
+import timeit
+
+import attr
+
+from pyclts import TranscriptionSystem
+
+
+def main(number=20):
+    bipa = TranscriptionSystem('bipa')
+    sounds = [s for s in bipa.sounds.values() if s.type != 'marker']
+    sounds += [bipa[s] for s in ['dʱʷ', 'kʰʷ', 'ʰbʲ', 'ãː', 'ai', 'tk']]
+
+    def ops(sounds):
+        index = {sound: i for i, sound in enumerate(sounds)}
+        assert len(set(sounds)) <= len(index)
+        return [index[sound] for sound in sounds], [sound.s for sound in sounds]
+
+    for label, setup in [
+        # Fresh copies of the sounds, i.e. name, featureset etc. must be computed:
+        ('first access', lambda: [attr.evolve(s) for s in sounds]),
+        ('repeated access', lambda: sounds),
+    ]:
+        copies = [setup() for _ in range(number)]
+        t = timeit.timeit(lambda: ops(copies.pop()), number=number)
+        print('{0:<16} {1} sounds: {2:.2f}ms'.format(label, len(sounds), t / number * 1e3))
+
+
+if __name__ == '__main__':
+    main()
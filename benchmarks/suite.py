@@ -0,0 +1,217 @@
+# coding: utf8
+"""
+Benchmark suite for loading transcription systems and resolving sounds.
+
+The token streams are taken from the graphemes of the transcription data and from the
+test data. Results are written to a JSON file and can be compared with a baseline,
+where a case fails if it is slower than the baseline by more than its threshold
+factor, as specified in `thresholds.json`.
+
+Usage: python benchmarks/suite.py [--output FILE] [--compare BASELINE] [--save BASELINE]
+                                  [CASE ...]
+
+Since timings depend on the machine, baselines are not shared, but created on the machine
+they are compared on, e.g. with `python benchmarks/suite.py --save benchmarks/baseline.json`.
+"""
+from __future__ import unicode_literals, print_function, division
+import os
+import sys
+import json
+import shutil
+import timeit
+import argparse
+import tempfile
+import contextlib
+from collections import OrderedDict, defaultdict
+
+from clldutils.path import Path
+from clldutils.dsv import reader
+
+from pyclts import TranscriptionSystem, SoundClasses
+from pyclts.api import CLTS
+from pyclts.dump import Dump
+from pyclts.util import nfd, pkg_path
+
+HERE = Path(__file__).parent
+TEST_DATA = HERE.parent / 'tests' / 'data' / 'test_data.tsv'
+THRESHOLDS = HERE / 'thresholds.json'
+
+
+@contextlib.contextmanager
+def cache_dir(path):
+    """Temporarily set the pyclts cache directory."""
+    old = os.environ.get('PYCLTS_CACHE_DIR')
+    os.environ['PYCLTS_CACHE_DIR'] = path
+    try:
+        yield
+    finally:
+        if old is None:
+            del os.environ['PYCLTS_CACHE_DIR']
+        else:
+            os.environ['PYCLTS_CACHE_DIR'] = old
+
+
+def load(id_):
+    """Load a transcription system, by-passing the instance cache."""
+    ts = object.__new__(TranscriptionSystem)
+    ts.id = id_
+    ts.__init__(id_)
+    return ts
+
+
+def token_streams(bipa):
+    """
+    Collect the distinct graphemes of the transcription data and the test data and
+    group them by how they are resolved.
+    """
+    tokens = set(nfd(row['source']) for row in reader(TEST_DATA, delimiter='\t', dicts=True))
+    for p in sorted(pkg_path('transcriptiondata').iterdir(), key=lambda p: p.name):
+        tokens.update(
+            nfd(row['GRAPHEME']) for row in reader(p, delimiter='\t', dicts=True))
+
+    streams = defaultdict(list)
+    for token in sorted(t for t in tokens if t.strip()):
+        try:
+            sound = bipa._parse(token)
+        except ValueError:  # pragma: no cover
+            continue
+        if token in bipa.sounds:
+            streams['direct'].append(token)
+        elif sound.type == 'unknownsound':
+            streams['unknown'].append(token)
+        elif sound.type in ['diphthong', 'cluster']:
+            streams['complex'].append(token)
+        elif sound.type != 'marker':
+            streams['generated'].append(token)
+    return streams
+
+
+def cases(tmp):
+    """
+    :return: `list` of triples `(name, number of items, callable)`.
+    """
+    bipa, asjp, sca = TranscriptionSystem('bipa'), TranscriptionSystem('asjpcode'), \
+        SoundClasses('sca')
+    streams = token_streams(bipa)
+    known = streams['direct'] + streams['generated'] + streams['complex']
+    names = [
+        bipa[t].name for t in streams['direct'] + streams['generated']
+        if bipa[t].type != 'marker']
+    generated = [bipa[t] for t in streams['generated'] + streams['complex']]
+    # Warm the caches of lookups and translation:
+    [bipa[t] for t in known + streams['unknown']]
+    translatable = []
+    for t in known:
+        try:
+            bipa.translate(t, asjp)
+            translatable.append(t)
+        except ValueError:  # asjp cannot represent this sound.
+            pass
+
+    def load_snapshot():
+        with cache_dir(str(tmp / 'snapshots')):
+            load('bipa')
+
+    def load_data():
+        with cache_dir(''):
+            load('bipa')
+
+    def dump():
+        directory = tempfile.mkdtemp(dir=str(tmp))
+        Dump(CLTS(str(tmp)), directory=directory).write(test=True)
+        shutil.rmtree(directory)
+
+    # Make sure a snapshot exists:
+    load_snapshot()
+    tmp.joinpath('data').mkdir()
+
+    return [
+        ('load (data files)', 1, load_data),
+        ('load (snapshot)', 1, load_snapshot),
+        ('parse (direct hits)', len(streams['direct']),
+         lambda: [bipa._parse(t) for t in streams['direct']]),
+        ('parse (generated)', len(streams['generated']),
+         lambda: [bipa._parse(t) for t in streams['generated']]),
+        ('parse (diphthongs, clusters)', len(streams['complex']),
+         lambda: [bipa._parse(t) for t in streams['complex']]),
+        ('parse (unknown)', len(streams['unknown']),
+         lambda: [bipa._parse(t) for t in streams['unknown']]),
+        ('lookup (cached)', len(known), lambda: [bipa[t] for t in known]),
+        ('from_name', len(names), lambda: [bipa._from_name(n) for n in names]),
+        ('translate', len(translatable),
+         lambda: bipa.translate(' '.join(translatable), asjp)),
+        ('soundclasses back-off', len(generated),
+         lambda: [sca._back_off(s) for s in generated]),
+        ('dump (test)', 1, dump),
+    ]
+
+
+def run(selected=None, repeat=5):
+    tmp = Path(tempfile.mkdtemp())
+    results = OrderedDict()
+    try:
+        for name, items, func in cases(tmp):
+            if selected and name not in selected:
+                continue
+            # Calibrate the number of calls per measurement to take at least 0.2s:
+            number = 1
+            while number < 1000 and timeit.timeit(func, number=number) < 0.2:
+                number *= 2
+            seconds = min(timeit.repeat(func, number=number, repeat=repeat)) / number
+            results[name] = dict(seconds=seconds, items=items)
+            print('{0:<30} {1:>6} items {2:12.6f}s {3:10.2f}us/item'.format(
+                name, items, seconds, seconds / items * 1e6))
+    finally:
+        shutil.rmtree(str(tmp))
+    return results
+
+
+def compare(results, baseline, thresholds):
+    """
+    :return: `list` of messages about cases which are slower than allowed.
+    """
+    failures = []
+    for name, result in results.items():
+        if name in baseline:
+            threshold = thresholds['cases'].get(name, thresholds['default'])
+            ratio = result['seconds'] / baseline[name]['seconds']
+            print('{0:<30} {1:6.2f}x baseline (threshold {2:.2f}x)'.format(
+                name, ratio, threshold))
+            if ratio > threshold:
+                failures.append('{0}: {1:.2f}x slower than baseline'.format(name, ratio))
+    return failures
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('cases', nargs='*', help='names of cases to run')
+    parser.add_argument('--output', help='JSON file to write results to')
+    parser.add_argument('--compare', help='JSON file with baseline results')
+    parser.add_argument('--save', help='JSON file to write results to as new baseline')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(args)
+
+    if args.compare and not os.path.exists(args.compare):
+        print('Baseline {0} not found, create it with --save'.format(args.compare))
+        return 2
+
+    results = run(selected=args.cases, repeat=args.repeat)
+    for fname in [args.output, args.save]:
+        if fname:
+            with open(fname, 'w') as fp:
+                json.dump(results, fp, indent=2)
+
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)
+        with THRESHOLDS.open() as fp:
+            thresholds = json.load(fp)
+        failures = compare(results, baseline, thresholds)
+        if failures:
+            print('\n'.join(failures))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
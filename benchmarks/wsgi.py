@@ -0,0 +1,58 @@
+# coding: utf8
+"""
+Load-test the WSGI application in-process, i.e. without HTTP overhead.
+
+Usage: python benchmarks/wsgi.py [REPOS] [THREADS]
+
+REPOS must contain the data tables written by `clts dump`. To load-test a running
+server (`clts serve`), use an HTTP benchmarking tool like `ab` or `wrk` instead.
+"""
+from __future__ import unicode_literals, print_function, division
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+from multiprocessing.pool import ThreadPool
+
+from six.moves.urllib.parse import urlencode
+
+from clldutils.path import Path
+
+from pyclts.api import CLTS
+from pyclts.wsgi import App
+
+
+def main(repos=None, threads=4, number=5000):
+    repos = CLTS(repos or Path(__file__).parent.parent)
+    if not repos.data_path('graphemes.tsv').exists():
+        print('Run `clts dump` first.')
+        return
+    app = App(repos)
+    names = [r['NAME'] for r in app.db.query('SELECT NAME FROM sounds LIMIT 1000')]
+    graphemes = [r['GRAPHEME'] for r in app.db.query(
+        "SELECT DISTINCT GRAPHEME FROM graphemes WHERE DATASET = 'phoible' LIMIT 1000")]
+
+    def request(environ):
+        setup_testing_defaults(environ)
+        return b''.join(app(environ, lambda status, headers: None))
+
+    for label, environs in [
+        ('sound (json)', [
+            {'PATH_INFO': '/sound', 'QUERY_STRING': urlencode({'format': 'json', 'name': n})}
+            for n in names]),
+        ('sound (html)', [
+            {'PATH_INFO': '/sound', 'QUERY_STRING': urlencode({'name': n})} for n in names]),
+        ('resolve (json)', [
+            {'PATH_INFO': '/resolve', 'QUERY_STRING': urlencode({'format': 'json', 'grapheme': g})}
+            for g in graphemes]),
+    ]:
+        environs = [dict(environs[i % len(environs)]) for i in range(number)]
+        pool = ThreadPool(threads)
+        start = time.time()
+        pool.map(request, environs, 50)
+        elapsed = time.time() - start
+        pool.close()
+        print('{0:<16} {1:.0f} requests/s'.format(label, number / elapsed))
+
+
+if __name__ == '__main__':
+    main(*[int(a) if a.isdigit() else a for a in sys.argv[1:]])
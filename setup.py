@@ -18,7 +18,9 @@ setup(
     ],
     extras_require={
         'dev': ['flake8', 'wheel', 'twine'],
+        'numpy': ['numpy'],
         'test': [
+            'numpy',
             'pytest>=3.6',
             'pytest-mock',
             'mock',
@@ -4,12 +4,12 @@ Main command line interface to the pyclts package.
 """
 from __future__ import unicode_literals, print_function, division
 import sys
-from collections import defaultdict, Counter
+import time
+from collections import defaultdict
 import json
 from six import text_type
 import tabulate
 from uritemplate import URITemplate
-import attr
 
 from clldutils.clilib import ArgumentParserWithLogging, command
 from clldutils.dsv import reader, UnicodeWriter
@@ -18,9 +18,10 @@ from clldutils.path import Path
 
 from pyclts.transcriptionsystem import TranscriptionSystem
 from pyclts.soundclasses import SOUNDCLASS_SYSTEMS
-from pyclts.models import is_valid_sound
 from pyclts.util import pkg_path
 from pyclts.api import CLTS
+from pyclts.convert import Converter
+from pyclts.dump import Dump
 
 
 @command()
@@ -67,7 +68,7 @@ def _make_package(args):  # pragma: no cover
                 bipa_sound = bipa[row['BIPA']]
                 explicit = '+'
             generated = '+' if bipa_sound.generated else ''
-            if is_valid_sound(bipa_sound, bipa):
+            if bipa.is_valid(bipa_sound):
                 bipa_grapheme = bipa_sound.s
                 bipa_name = bipa_sound.name
             else:
@@ -149,154 +150,77 @@ def _make_app_data(args, test=False):
         if test:
             break
 
-    datafile = args.repos.app_path('data.js')
-    with datafile.open('w', encoding='utf8') as handler:
-        handler.write('var BIPA = ' + json.dumps(all_sounds, indent=2) + ';\n')
-        handler.write('var normalize = ' + json.dumps(tts._normalize) + ';\n')
-    args.log.info('{0} written'.format(datafile))
-
-
-@attr.s
-class Grapheme(object):
-    GRAPHEME = attr.ib()
-    NAME = attr.ib()
-    EXPLICIT = attr.ib()
-    ALIAS = attr.ib()
-    DATASET = attr.ib()
-    FREQUENCY = attr.ib(default=0)
-    URL = attr.ib(default='')
-    FEATURES = attr.ib(default='')
-    IMAGE = attr.ib(default='')
-    SOUND = attr.ib(default='')
-    NOTE = attr.ib(default='')
+    index = _write_app_data(args.repos.app_path('data'), all_sounds, tts._normalize)
+    args.log.info('{0} shards written'.format(len(index['shards'])))
+
+
+def _shard_key(grapheme):
+    return '{0:x}'.format(ord(grapheme[0])) if grapheme else '0'
+
+
+def _write_app_data(directory, all_sounds, normalize):
+    """
+    Write the data of the browser app as compact JSON shards, keyed by the code point
+    of the first character of the graphemes they contain, and an index of the shards.
+
+    Graphemes which are aliases of each other share one record, referenced by ID. Each
+    file is also written gzip- and - if the brotli package is installed - brotli
+    compressed.
+    """
+    import gzip
+    try:
+        import brotli
+    except ImportError:  # pragma: no cover
+        brotli = None
+
+    def write(fname, obj):
+        data = json.dumps(
+            obj, separators=(',', ':'), sort_keys=True, ensure_ascii=False).encode('utf8')
+        with directory.joinpath(fname).open('wb') as fp:
+            fp.write(data)
+        # mtime=0 makes the compressed files reproducible:
+        with gzip.GzipFile(str(directory.joinpath(fname + '.gz')), 'wb', mtime=0) as fp:
+            fp.write(data)
+        if brotli:  # pragma: no cover
+            with directory.joinpath(fname + '.br').open('wb') as fp:
+                fp.write(brotli.compress(data))
+
+    if directory.exists():
+        for p in directory.iterdir():
+            if p.suffix in ['.json', '.gz', '.br']:
+                p.unlink()
+    else:
+        directory.mkdir()
+
+    ids, shards = {}, defaultdict(lambda: dict(sounds={}, graphemes={}))
+    for grapheme in sorted(all_sounds):
+        record = all_sounds[grapheme]
+        # Aliases refer to the same dict, thus share an ID:
+        rid = ids.setdefault(id(record), len(ids))
+        shard = shards[_shard_key(grapheme)]
+        shard['graphemes'][grapheme] = rid
+        shard['sounds'][rid] = record
+
+    index = dict(normalize=normalize, shards={})
+    for key, shard in sorted(shards.items()):
+        fname = '{0}.json'.format(key)
+        write(fname, shard)
+        index['shards'][key] = fname
+    write('index.json', index)
+    return index
 
 
 @command()
 def dump(args, test=False):
-    sounds = defaultdict(dict)
-    data = []
-    bipa = TranscriptionSystem('bipa')
-    # start from assembling bipa-sounds
-    for grapheme, sound in sorted(
-            bipa.sounds.items(), key=lambda p: p[1].alias if p[1].alias else False):
-        if sound.type not in ['marker']:
-            if sound.alias:
-                assert sound.name in sounds
-                sounds[sound.name]['aliases'].add(grapheme)
-            else:
-                assert sound.name not in sounds
-                sounds[sound.name] = {
-                    'grapheme': grapheme,
-                    'unicode': sound.uname or '',
-                    'generated': '',
-                    'note': sound.note or '',
-                    'type': sound.type,
-                    'aliases': set(),
-                    'normalized': '+' if sound.normalized else ''
-                }
-            data.append(Grapheme(
-                grapheme,
-                sound.name,
-                '+',
-                '',
-                'bipa',
-                '0',
-                '',
-                '',
-                '',
-                '',
-                sound.note or ''))
-
-    # add sounds systematically by their alias
-    for td in args.repos.iter_transcriptiondata():
-        for name in td.names:
-            bipa_sound = bipa[name]
-            # check for consistency of mapping here
-            if not is_valid_sound(bipa_sound, bipa):
-                continue
-
-            sound = sounds.get(name)
-            if not sound:
-                sound = sounds[name] = {
-                    'grapheme': bipa_sound.s,
-                    'aliases': {bipa_sound.s},
-                    'generated': '+',
-                    'unicode': bipa_sound.uname or '',
-                    'note': '',
-                    'type': bipa_sound.type,
-                    'alias': '+' if bipa_sound.alias else '',
-                    'normalized': '+' if bipa_sound.normalized else ''
-                }
-
-            for item in td.data[name]:
-                sound['aliases'].add(item['grapheme'])
-                # add the values here
-                data.append(Grapheme(
-                    item['grapheme'],
-                    name,
-                    item['explicit'],
-                    '',  # sounds[name]['alias'],
-                    td.id,
-                    item.get('frequency', ''),
-                    item.get('url', ''),
-                    item.get('features', ''),
-                    item.get('image', ''),
-                    item.get('sound', ''),
-                ))
-        if test:
-            break
-
-    # sound classes have a generative component, so we need to treat them
-    # separately
-    for sc in args.repos.iter_soundclass():
-        for name in sounds:
-            try:
-                grapheme = sc[name]
-                data.append(Grapheme(
-                    grapheme,
-                    name,
-                    '+' if name in sc.data else '',
-                    '',
-                    sc.id,
-                ))
-            except KeyError:  # pragma: no cover
-                args.log.debug(name, sounds[name]['grapheme'])
-        if test:
-            break
-
-    # last run, check again for each of the remaining transcription systems,
-    # whether we can translate the sound
-    for ts in args.repos.iter_transcriptionsystem(exclude=['bipa']):
-        for name in sounds:
-            try:
-                ts_sound = ts[name]
-                if is_valid_sound(ts_sound, ts):
-                    sounds[name]['aliases'].add(ts_sound.s)
-                    data.append(Grapheme(
-                        ts_sound.s,
-                        name,
-                        '' if sounds[name]['generated'] else '+',
-                        '',  # sounds[name]['alias'],
-                        ts.id,
-                    ))
-            except ValueError:
-                pass
-            except TypeError:
-                args.log.debug('{0}: {1}'.format(ts.id, name))
-        if test:
-            break
-
-    with UnicodeWriter(args.repos.data_path('sounds.tsv'), delimiter='\t') as writer:
-        writer.writerow([
-            'NAME', 'TYPE', 'GRAPHEME', 'UNICODE', 'GENERATED', 'NOTE'])
-        for k, v in sorted(sounds.items(), reverse=True):
-            writer.writerow([
-                k, v['type'], v['grapheme'], v['unicode'], v['generated'], v['note']])
+    """
+    Write the tables data/sounds.tsv and data/graphemes.tsv.
 
-    with UnicodeWriter(args.repos.data_path('graphemes.tsv'), delimiter='\t') as writer:
-        writer.writerow([f.name for f in attr.fields(Grapheme)])
-        for row in data:
-            writer.writerow(attr.astuple(row))
+    Slices of the tables are cached per data source, thus only slices whose inputs
+    changed are recomputed - in a pool of processes, if --workers is specified.
+    """
+    d = Dump(args.repos, log=args.log)
+    d.write(test=test, workers=args.workers)
+    args.log.info('{0} of {1} slices recomputed'.format(len(d.computed), len(d.manifest)))
 
 
 @command()
@@ -317,7 +241,7 @@ def dstats(args):
     table = [['id', 'valid', 'total', 'percent']]
     bipa = TranscriptionSystem('bipa')
     for td in args.repos.iter_transcriptiondata():
-        ln = [1 if is_valid_sound(bipa[name], bipa) else 0 for name in td.names]
+        ln = [1 if bipa.is_valid(name) else 0 for name in td.names]
         table += [[
             td.id,
             sum(ln),
@@ -330,28 +254,14 @@ def dstats(args):
 
 @command()
 def stats(args):
-    sounds = {}
-    for row in reader(args.repos.data_path('sounds.tsv'), delimiter='\t', dicts=True):
-        sounds[row['NAME']] = row
-    graphs = {}
-    for row in reader(args.repos.data_path('graphemes.tsv'), delimiter='\t', dicts=True):
-        graphs['{GRAPHEME}-{NAME}-{DATASET}'.format(**row)] = row
-
-    graphdict = defaultdict(list)
-    for id_, row in graphs.items():
-        graphdict[row['GRAPHEME']] += [row['DATASET']]
-
+    stats = args.repos.db.stats()
     text = [['DATA', 'STATS', 'PERC']]
-    text.append(
-        ['Unique graphemes', len(set(row['GRAPHEME'] for row in graphs.values())), ''])
-    text.append(['different sounds', len(sounds), ''])
-    text.append(
-        ['singletons', len([g for g in graphdict if len(set(graphdict[g])) == 1]), ''])
-    text.append(
-        ['multiples', len([g for g in graphdict if len(set(graphdict[g])) > 1]), ''])
-    total = len(sounds)
-    for type_, count in Counter([s['TYPE'] for s in sounds.values()]).most_common():
-        text.append([type_ + 's', count, '{0:.2f}'.format(count / total)])
+    text.append(['Unique graphemes', stats['graphemes'], ''])
+    text.append(['different sounds', stats['sounds'], ''])
+    text.append(['singletons', stats['singletons'], ''])
+    text.append(['multiples', stats['multiples'], ''])
+    for type_, count in stats['types']:
+        text.append([type_ + 's', count, '{0:.2f}'.format(count / stats['sounds'])])
 
     print(tabulate.tabulate(text, headers='firstrow'))
 
@@ -390,6 +300,61 @@ def table(args):
         print(tbl.render(tablefmt=args.format, condensed=False))
 
 
+@command()
+def normalize(args):
+    """
+    Add the segments of a table column in a transcription system (and sound classes).
+
+    clts normalize [FILE] --column=COLUMN [--soundclass=SOUNDCLASS] [--delimiter=DELIMITER]
+        [--workers=N]
+
+    The table is read from FILE or - if FILE is omitted or "-" - from stdin, and written
+    to stdout.
+    """
+    converter = Converter(args.system, soundclass=args.soundclass or None)
+    fname = args.args[0] if args.args else '-'
+    start, rows = time.time(), 0
+    with UnicodeWriter(sys.stdout, delimiter=args.delimiter) as writer:
+        for row in converter.convert_rows(
+                reader(sys.stdin if fname == '-' else Path(fname), delimiter=args.delimiter),
+                args.column,
+                workers=args.workers):
+            writer.writerow(row)
+            rows += 1
+    elapsed = time.time() - start
+    args.log.info('{0} rows with {1} tokens in {2:.1f}s ({3:.0f} tokens/s)'.format(
+        max(rows - 1, 0), converter.tokens, elapsed, converter.tokens / (elapsed or 1)))
+    args.log.info('{0} unknown tokens of {1} types'.format(
+        sum(converter.unknown.values()), len(converter.unknown)))
+    for token, count in converter.unknown.most_common(10):
+        args.log.info('unknown: {0} ({1})'.format(token, count))
+
+
+@command()
+def serve(args):  # pragma: no cover
+    """
+    Serve lookups of sounds via HTTP, see `pyclts.wsgi`.
+
+    clts [--host=localhost] [--port=8000] serve
+    """
+    from pyclts.wsgi import App, serve
+
+    app = App(args.repos, systems=[args.system])
+    args.log.info('serving on http://{0}:{1}'.format(args.host, args.port))
+    serve(app, host=args.host, port=args.port)
+
+
+def _print_profile(file=None):
+    for ts in TranscriptionSystem.instances():
+        rows = ts.stats.table()
+        if rows:
+            print('\n# Profile of {0}\n'.format(ts.id), file=file or sys.stderr)
+            print(tabulate.tabulate(
+                rows,
+                headers=['METHOD', 'BRANCH', 'COUNT', 'TOTAL (ms)', 'MEAN (us)'],
+                floatfmt='.2f'), file=file or sys.stderr)
+
+
 def main(args=None):  # pragma: no cover
     parser = ArgumentParserWithLogging('pyclts')
     parser.add_argument(
@@ -413,7 +378,38 @@ def main(args=None):  # pragma: no cover
     parser.add_argument(
         '--system', help="specify the transcription system you want to load",
         default="bipa")
+    parser.add_argument(
+        '--column', help="name of the column with segments to normalize",
+        default="Segments")
+    parser.add_argument(
+        '--soundclass', help="specify a sound class system to add to normalized output",
+        default=None)
+    parser.add_argument(
+        '--delimiter', help="delimiter of tabular input and output",
+        default="\t")
+    parser.add_argument(
+        '--workers', help="number of worker processes to use",
+        type=int,
+        default=None)
+    parser.add_argument(
+        '--host', help="host name to serve on",
+        default="localhost")
+    parser.add_argument(
+        '--port', help="port to serve on",
+        type=int,
+        default=8000)
+
+    parser.add_argument(
+        '--profile', help="report counts and timings of the ways sounds were resolved",
+        action='store_true')
 
-    res = parser.main(args=args)
+    parsed_args = parser.parse_args(args=args)
+    if parsed_args.profile:
+        TranscriptionSystem.profile = True
+        for ts in TranscriptionSystem.instances():
+            ts.stats.enable()
+    res = parser.main(parsed_args=parsed_args)
+    if parsed_args.profile:
+        _print_profile()
     if args is None:  # pragma: no cover
         sys.exit(res)
@@ -2,17 +2,26 @@
 from __future__ import unicode_literals, print_function, division
 
 from clldutils.apilib import API
+from clldutils.misc import lazyproperty
 from csvw.dsv import reader
 
 from pyclts.util import pkg_path
 from pyclts import TranscriptionData, TranscriptionSystem, SoundClasses
 from pyclts.soundclasses import SOUNDCLASS_SYSTEMS
+from pyclts.db import Database
 
 
 class CLTS(API):
     def data_path(self, *comps):
         return self.repos.joinpath('data', *comps)
 
+    @lazyproperty
+    def db(self):
+        """
+        An indexed store of the data tables, see `pyclts.db.Database`.
+        """
+        return Database.from_repos(self)
+
     def app_path(self, *comps):
         return self.repos.joinpath('app', *comps)
 
@@ -24,18 +33,42 @@ class CLTS(API):
                 if graphemesp.exists():
                     yield src, list(reader(graphemesp, dicts=True, delimiter='\t'))
 
+    def transcriptiondata_ids(self):
+        """
+        :return: Sorted `list` of the IDs of the available transcription data.
+        """
+        return sorted(td.stem for td in pkg_path('transcriptiondata').iterdir())
+
     def iter_transcriptiondata(self):
-        for td in sorted(pkg_path('transcriptiondata').iterdir(), key=lambda p: p.name):
-            yield TranscriptionData(td.stem)
+        for id_ in self.transcriptiondata_ids():
+            yield TranscriptionData(id_)
 
     def iter_soundclass(self):
         for sc in SOUNDCLASS_SYSTEMS:
             yield SoundClasses(sc)
 
+    def transcriptionsystem_ids(self, include_private=False):
+        """
+        :return: Sorted `list` of the IDs of the available transcription systems.
+        """
+        return sorted(
+            ts.name for ts in pkg_path('transcriptionsystems').iterdir()
+            if ts.is_dir() and ((not ts.name.startswith('_')) or include_private))
+
     def iter_transcriptionsystem(self, include_private=False, exclude=None):
         exclude = exclude or []
-        for ts in sorted(pkg_path('transcriptionsystems').iterdir(), key=lambda p: p.name):
-            if ts.is_dir():
-                if (not ts.name.startswith('_')) or include_private:
-                    if ts.name not in exclude:
-                        yield TranscriptionSystem(ts.name)
+        for id_ in self.transcriptionsystem_ids(include_private=include_private):
+            if id_ not in exclude:
+                yield TranscriptionSystem(id_)
+
+    def audit(self, system='bipa'):
+        """
+        Check the mappings of all transcription data to sounds of a transcription system.
+
+        :return: `dict` mapping transcription data IDs to the `list` of CLTS names in the \
+        data, which are not valid in the system.
+        """
+        ts = TranscriptionSystem(system)
+        return {
+            td.id: ts.audit(name for name in td.names if name != '<NA>')
+            for td in self.iter_transcriptiondata()}
@@ -0,0 +1,159 @@
+# coding: utf-8
+"""
+Conversion of segmented strings in large tabular data.
+"""
+from __future__ import unicode_literals
+import multiprocessing
+from collections import Counter
+from itertools import islice
+
+from pyclts.util import UNKNOWN
+from pyclts.transcriptionsystem import TranscriptionSystem
+from pyclts.soundclasses import SoundClasses
+
+__all__ = ['Converter', 'process_pool']
+
+# The converter and column index used in a worker process.
+_WORKER = None
+
+
+def _init_worker(converter, index):
+    global _WORKER
+    _WORKER = (converter, index)
+
+
+def _convert_chunk(rows):
+    converter, index = _WORKER
+    converter.tokens, converter.unknown = 0, Counter()
+    rows = [converter._convert_row(row, index) for row in rows]
+    return rows, converter.tokens, converter.unknown
+
+
+def _chunks(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            break
+        yield chunk
+
+
+def process_pool(workers, initializer=None, initargs=()):
+    """
+    Create a process pool, forking the workers where possible, so that they inherit the
+    transcription systems, sound classes and transcription data loaded in the parent.
+    """
+    try:
+        context = multiprocessing.get_context('fork')
+    except (AttributeError, ValueError):  # pragma: no cover
+        # Python 2 or a platform without fork: Workers will re-load the systems.
+        context = multiprocessing
+    return context.Pool(workers, initializer=initializer, initargs=initargs)
+
+
+class Converter(object):
+    """
+    Maps segmented strings through a transcription system and, optionally, sound classes.
+
+    Results are cached per token type, and tokens which cannot be resolved are counted.
+    """
+    def __init__(self, system='bipa', soundclass=None):
+        self.system = TranscriptionSystem(system)
+        self.soundclass = SoundClasses(soundclass) if soundclass else None
+        self.tokens = 0
+        self.unknown = Counter()
+        self._cache = {}
+
+    @property
+    def columns(self):
+        """The names of the columns added by `convert_row`."""
+        res = [self.system.id.upper()]
+        if self.soundclass:
+            res.append(self.soundclass.id.upper())
+        return res
+
+    def _convert(self, token):
+        try:
+            sound = self.system[token]
+        except ValueError:  # The token looked like a sound name, but isn't valid.
+            sound = None
+        if sound is None or sound.type == 'unknownsound':
+            return None
+        return (
+            '{0}'.format(sound),
+            self.soundclass.get(sound, '0') if self.soundclass else None)
+
+    def convert_token(self, token):
+        """
+        :return: Pair of the token in the transcription system and in sound classes, or \
+        `None` if the token cannot be resolved.
+        """
+        try:
+            res = self._cache[token]
+        except KeyError:
+            res = self._cache[token] = self._convert(token)
+        self.tokens += 1
+        if res is None:
+            self.unknown[token] += 1
+        return res
+
+    def convert(self, segments):
+        """
+        Convert a string of whitespace separated segments.
+
+        :return: `list` with one converted string per column in `columns`.
+        """
+        converted = [self.convert_token(token) for token in segments.split()]
+        res = [' '.join(c[0] if c else UNKNOWN for c in converted)]
+        if self.soundclass:
+            res.append(' '.join(c[1] if c else '0' for c in converted))
+        return res
+
+    def _convert_row(self, row, index):
+        return row + self.convert(row[index] if index < len(row) else '')
+
+    def convert_rows(self, rows, column, workers=None, chunksize=1000):
+        """
+        Convert the segments in a column of a table.
+
+        :param rows: Iterable of `list`s, starting with the header.
+        :param column: Name of the column with the segments.
+        :param workers: If specified, convert chunks of rows in a pool of `workers` \
+        processes. The first chunk is converted in the current process, thus workers \
+        inherit a warm cache.
+        :param chunksize: Number of rows passed to a worker at once.
+        :return: Generator of rows with the additional columns in `columns`, in the order \
+        of the input.
+        """
+        rows = iter(rows)
+        header = next(rows)
+        if column not in header:
+            raise ValueError('unknown column: {0}'.format(column))
+        index = header.index(column)
+        yield header + self.columns
+
+        if not workers or workers < 2:
+            for row in rows:
+                yield self._convert_row(row, index)
+            return
+
+        chunks = _chunks(rows, chunksize)
+        for row in next(chunks, []):
+            yield self._convert_row(row, index)
+
+        pool = process_pool(workers, initializer=_init_worker, initargs=(self, index))
+        try:
+            while True:
+                # We only read a bounded number of chunks at a time, to keep memory
+                # consumption constant.
+                batch = list(islice(chunks, 4 * workers))
+                if not batch:
+                    break
+                for converted, tokens, unknown in pool.map(_convert_chunk, batch):
+                    self.tokens += tokens
+                    self.unknown.update(unknown)
+                    for row in converted:
+                        yield row
+        finally:
+            pool.close()
+            pool.join()
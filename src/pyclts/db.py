@@ -0,0 +1,212 @@
+# coding: utf-8
+"""
+An indexed SQLite store of the CLTS data tables `sounds.tsv` and `graphemes.tsv`.
+
+The database is built from the tables on first access and rebuilt whenever the
+content of the tables changes. It is opened read-only, with one connection per
+thread, thus a `Database` can be shared by threads.
+"""
+from __future__ import unicode_literals
+import os
+import sqlite3
+import threading
+
+from clldutils.dsv import reader
+
+from pyclts.snapshot import file_hash
+from pyclts.util import atomic_path
+
+__all__ = ['Database']
+
+# Included in the stored version, so databases with an outdated schema are rebuilt.
+SCHEMA_VERSION = 1
+
+SOUNDS = ['NAME', 'TYPE', 'GRAPHEME', 'UNICODE', 'GENERATED', 'NOTE']
+GRAPHEMES = [
+    'GRAPHEME',
+    'NAME',
+    'EXPLICIT',
+    'ALIAS',
+    'DATASET',
+    'FREQUENCY',
+    'URL',
+    'FEATURES',
+    'IMAGE',
+    'SOUND',
+    'NOTE',
+]
+INDEXES = [('GRAPHEME',), ('NAME',), ('DATASET',), ('NAME', 'DATASET')]
+
+
+class Database(object):
+    def __init__(self, fname, sounds, graphemes):
+        """
+        :param fname: Path of the SQLite database file.
+        :param sounds: Path of `sounds.tsv`.
+        :param graphemes: Path of `graphemes.tsv`.
+        """
+        self.fname = str(fname)
+        self.tables = [sounds, graphemes]
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._checked = False
+
+    @classmethod
+    def from_repos(cls, repos):
+        """
+        :param repos: `CLTS` instance.
+        """
+        return cls(
+            repos.data_path('clts.sqlite'),
+            repos.data_path('sounds.tsv'),
+            repos.data_path('graphemes.tsv'))
+
+    @property
+    def version(self):
+        """The hash of the data tables, the database must have been built from."""
+        return file_hash(self.tables, SCHEMA_VERSION)
+
+    def _stored_version(self):
+        if not os.path.exists(self.fname):
+            return
+        db = sqlite3.connect(self.fname)
+        try:
+            return db.execute('SELECT version FROM meta').fetchone()[0]
+        except sqlite3.Error:
+            return
+        finally:
+            db.close()
+
+    def create(self):
+        """(Re-)build the database from the data tables."""
+        with atomic_path(self.fname) as tmp:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            db = sqlite3.connect(tmp)
+            try:
+                db.execute('CREATE TABLE meta (version TEXT)')
+                db.execute('INSERT INTO meta VALUES (?)', (self.version,))
+                for table, cols, path in [
+                    ('sounds', SOUNDS, self.tables[0]),
+                    ('graphemes', GRAPHEMES, self.tables[1]),
+                ]:
+                    db.execute('CREATE TABLE {0} ({1})'.format(
+                        table, ', '.join('{0} TEXT'.format(col) for col in cols)))
+                    db.executemany(
+                        'INSERT INTO {0} VALUES ({1})'.format(
+                            table, ', '.join('?' for _ in cols)),
+                        ([row.get(col, '') for col in cols]
+                         for row in reader(path, delimiter='\t', dicts=True)))
+                db.execute('CREATE UNIQUE INDEX sounds_NAME ON sounds (NAME)')
+                for cols in INDEXES:
+                    db.execute('CREATE INDEX graphemes_{0} ON graphemes ({1})'.format(
+                        '_'.join(cols), ', '.join(cols)))
+                db.commit()
+            finally:
+                db.close()
+
+    def update(self):
+        """
+        Build the database if it does not exist or is out-of-date.
+
+        :return: `True` if the database was (re-)built.
+        """
+        with self._lock:
+            if self._stored_version() != self.version:
+                self.create()
+                self._local = threading.local()
+                return True
+            return False
+
+    def connect(self):
+        """
+        :return: A new read-only connection to the database.
+        """
+        if not self._checked:
+            self.update()
+            self._checked = True
+        try:
+            db = sqlite3.connect(
+                'file:{0}?mode=ro'.format(self.fname), uri=True, check_same_thread=False)
+        except TypeError:  # pragma: no cover
+            # Python 2 does not support URIs.
+            db = sqlite3.connect(self.fname, check_same_thread=False)
+        db.row_factory = sqlite3.Row
+        return db
+
+    @property
+    def connection(self):
+        """The connection of the current thread."""
+        db = getattr(self._local, 'connection', None)
+        if db is None:
+            db = self._local.connection = self.connect()
+        return db
+
+    def query(self, sql, params=()):
+        """
+        Run a (parameterized) SQL query.
+
+        :return: `list` of `sqlite3.Row`s.
+        """
+        return self.connection.execute(sql, params).fetchall()
+
+    def _select(self, table, cols, **kw):
+        sql = 'SELECT * FROM {0}'.format(table)
+        where = [(col, kw[col.lower()]) for col in cols if kw.get(col.lower()) is not None]
+        if where:
+            sql += ' WHERE ' + ' AND '.join('{0} = ?'.format(col) for col, _ in where)
+        return [dict(row) for row in self.query(sql, [v for _, v in where])]
+
+    def sounds(self, name=None, type=None, grapheme=None):
+        """
+        :return: `list` of rows of the sounds table, matching all conditions passed as \
+        keyword arguments.
+        """
+        return self._select('sounds', SOUNDS, name=name, type=type, grapheme=grapheme)
+
+    def graphemes(self, grapheme=None, name=None, dataset=None):
+        """
+        :return: `list` of rows of the graphemes table, matching all conditions passed \
+        as keyword arguments.
+        """
+        return self._select(
+            'graphemes', GRAPHEMES, grapheme=grapheme, name=name, dataset=dataset)
+
+    def datasets(self, grapheme=None):
+        """
+        :return: Sorted `list` of the datasets - mapping `grapheme`, if specified.
+        """
+        if grapheme is None:
+            rows = self.query('SELECT DISTINCT DATASET FROM graphemes ORDER BY DATASET')
+        else:
+            rows = self.query(
+                'SELECT DISTINCT DATASET FROM graphemes WHERE GRAPHEME = ? ORDER BY DATASET',
+                (grapheme,))
+        return [row[0] for row in rows]
+
+    def names(self, grapheme):
+        """
+        :return: Sorted `list` of the names of sounds `grapheme` is mapped to.
+        """
+        return [row[0] for row in self.query(
+            'SELECT DISTINCT NAME FROM graphemes WHERE GRAPHEME = ? ORDER BY NAME',
+            (grapheme,))]
+
+    def stats(self):
+        """
+        :return: `dict` with summary statistics of the data.
+        """
+        res = dict(
+            graphemes=self.query('SELECT COUNT(DISTINCT GRAPHEME) FROM graphemes')[0][0],
+            sounds=self.query('SELECT COUNT(*) FROM sounds')[0][0])
+        # Number of graphemes by the number of datasets mapping them:
+        datasets = self.query(
+            'SELECT n = 1, COUNT(*) FROM '
+            '(SELECT COUNT(DISTINCT DATASET) AS n FROM graphemes GROUP BY GRAPHEME) '
+            'GROUP BY n = 1')
+        datasets = {bool(single): count for single, count in datasets}
+        res['singletons'] = datasets.get(True, 0)
+        res['multiples'] = datasets.get(False, 0)
+        res['types'] = [tuple(row) for row in self.query(
+            'SELECT TYPE, COUNT(*) AS c FROM sounds GROUP BY TYPE ORDER BY c DESC, TYPE')]
+        return res
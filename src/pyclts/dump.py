@@ -0,0 +1,328 @@
+# coding: utf-8
+"""
+Incremental assembly of the `sounds.tsv` and `graphemes.tsv` tables of the CLTS data.
+
+The tables are merged from slices, one for BIPA and one for each transcription
+data set, sound class system and other transcription system. Each slice is
+cached as JSON in the user cache directory (see `pyclts.snapshot.cache_dir`),
+keyed by a hash of its inputs, i.e. the data files of the source, the data files
+of BIPA, the code computing the slices and - for sound classes and transcription
+systems, which are computed for all sounds collected before - the list of sound
+names. Thus, after changing one data set, only the slice of this data set - and
+possibly the slices which depend on the list of sounds - must be recomputed.
+Independent slices can be computed in parallel processes.
+"""
+from __future__ import unicode_literals
+import os
+import json
+import hashlib
+from collections import OrderedDict
+
+import attr
+from clldutils import jsonlib
+from clldutils.dsv import UnicodeWriter
+
+from pyclts.util import pkg_path, atomic_path
+from pyclts.transcriptionsystem import TranscriptionSystem
+from pyclts.convert import process_pool
+from pyclts import snapshot
+
+__all__ = ['Grapheme', 'Dump']
+
+# Part of the keys of all slices, thus incrementing it invalidates cached slices.
+DUMP_VERSION = 2
+# The modules computing slices. Their code is part of the keys of all slices, too.
+MODULES = ['dump.py', 'soundclasses.py', 'transcriptiondata.py', 'translation.py']
+
+
+@attr.s
+class Grapheme(object):
+    GRAPHEME = attr.ib()
+    NAME = attr.ib()
+    EXPLICIT = attr.ib()
+    ALIAS = attr.ib()
+    DATASET = attr.ib()
+    FREQUENCY = attr.ib(default=0)
+    URL = attr.ib(default='')
+    FEATURES = attr.ib(default='')
+    IMAGE = attr.ib(default='')
+    SOUND = attr.ib(default='')
+    NOTE = attr.ib(default='')
+
+
+def _sound(sound, **kw):
+    res = {
+        'grapheme': sound.s,
+        'unicode': sound.uname or '',
+        'generated': '+',
+        'note': '',
+        'type': sound.type,
+    }
+    res.update(kw)
+    return res
+
+
+def bipa_slice():
+    bipa = TranscriptionSystem('bipa')
+    sounds, rows = [], []
+    for grapheme, sound in sorted(
+            bipa.sounds.items(), key=lambda p: p[1].alias if p[1].alias else False):
+        if sound.type not in ['marker']:
+            if not sound.alias:
+                sounds.append([sound.name, _sound(
+                    sound, grapheme=grapheme, generated='', note=sound.note or '')])
+            rows.append(attr.astuple(Grapheme(
+                grapheme,
+                sound.name,
+                '+',
+                '',
+                'bipa',
+                '0',
+                '',
+                '',
+                '',
+                '',
+                sound.note or '')))
+    return dict(sounds=sounds, rows=rows)
+
+
+def td_slice(td):
+    bipa = TranscriptionSystem('bipa')
+    sounds, rows = [], []
+    for name in td.names:
+        bipa_sound = bipa[name]
+        # check for consistency of mapping here
+        if not bipa.is_valid(bipa_sound):
+            continue
+        sounds.append([name, _sound(bipa_sound)])
+        for item in td.data[name]:
+            rows.append(attr.astuple(Grapheme(
+                item['grapheme'],
+                name,
+                item['explicit'],
+                '',
+                td.id,
+                item.get('frequency', ''),
+                item.get('url', ''),
+                item.get('features', ''),
+                item.get('image', ''),
+                item.get('sound', ''),
+            )))
+    return dict(rows=rows, sounds=sounds)
+
+
+def sc_slice(sc, names):
+    """
+    :param names: `list` of pairs `(name, generated)` for all sounds.
+    """
+    rows = []
+    for name, _ in names:
+        try:
+            rows.append(attr.astuple(Grapheme(
+                sc[name],
+                name,
+                '+' if name in sc.data else '',
+                '',
+                sc.id,
+            )))
+        except KeyError:  # pragma: no cover
+            pass
+    return dict(rows=rows)
+
+
+def ts_slice(ts, names):
+    """
+    :param names: `list` of pairs `(name, generated)` for all sounds.
+    """
+    rows = []
+    for name, generated in names:
+        if ts.is_valid(name):
+            rows.append(attr.astuple(Grapheme(
+                ts[name].s,
+                name,
+                '' if generated else '+',
+                '',
+                ts.id,
+            )))
+    return dict(rows=rows)
+
+
+def _compute(task):
+    func, args = task
+    return func(*args)
+
+
+def _hash(*items):
+    sha = hashlib.sha1()
+    for item in items:
+        sha.update(json.dumps(item, sort_keys=True).encode('utf8'))
+    return sha.hexdigest()
+
+
+class Dump(object):
+    """
+    Assembles the sounds and graphemes tables, re-using cached slices.
+    """
+    def __init__(self, repos, directory=None, log=None):
+        """
+        :param repos: `CLTS` instance.
+        :param directory: Directory to cache slices in, defaulting to the `dump` \
+        directory in the user cache directory. If caching is disabled, all slices are \
+        computed.
+        """
+        self.repos = repos
+        self.directory = directory or snapshot.cache_dir('dump')
+        self.log = log
+        # Maps slice IDs to the keys of the slices used in the last run:
+        self.manifest = OrderedDict()
+        self.computed = []
+        self.sounds = OrderedDict()
+
+    def _path(self, slice_id, key):
+        if self.directory:
+            return os.path.join(self.directory, '{0}.{1}.json'.format(slice_id, key))
+
+    def slices(self, jobs, pool=None):
+        """
+        Retrieve slices from the cache, or compute and cache them.
+
+        :param jobs: `list` of tuples `(slice_id, key, func, args)`, where `key` is the \
+        hash of all inputs of the slice and `func(*args)` computes the slice.
+        :param pool: Process pool to compute slices in.
+        :return: Generator of slices in the order of `jobs`.
+        """
+        paths, tasks = [], []
+        code = snapshot.file_hash([pkg_path(name) for name in MODULES])
+        for slice_id, key, func, args in jobs:
+            key = _hash(DUMP_VERSION, code, key)
+            self.manifest[slice_id] = key
+            path = self._path(slice_id, key)
+            cached = bool(path) and os.path.exists(path)
+            paths.append((slice_id, path, cached))
+            if not cached:
+                tasks.append((func, args))
+
+        if tasks and self.log:
+            self.log.info('computing {0} slices'.format(len(tasks)))
+        # imap returns results lazily and in the order of the tasks, thus merging is
+        # deterministic.
+        computed = pool.imap(_compute, tasks, 1) if pool else (_compute(t) for t in tasks)
+        for slice_id, path, cached in paths:
+            if cached:
+                yield jsonlib.load(path)
+            else:
+                slice_ = next(computed)
+                self.computed.append(slice_id)
+                if path:
+                    self._write_slice(slice_id, path, slice_)
+                yield slice_
+
+    def _write_slice(self, slice_id, path, slice_):
+        # Remove outdated versions of the slice:
+        if os.path.isdir(self.directory):
+            for fname in os.listdir(self.directory):
+                if fname.startswith(slice_id + '.') and fname.endswith('.json'):
+                    os.remove(os.path.join(self.directory, fname))
+        self._write_json(path, slice_)
+
+    def _write_json(self, path, obj):
+        try:
+            with atomic_path(path) as tmp:
+                jsonlib.dump(obj, tmp)
+        except (IOError, OSError):  # pragma: no cover
+            pass
+
+    def iter_rows(self, test=False, workers=None):
+        """
+        Generate the rows of the graphemes table, slice by slice.
+
+        Only one slice at a time and the summary of sounds - available as `sounds` once \
+        the rows of BIPA and the transcription data have been generated - are kept in \
+        memory.
+
+        :param test: If `True`, only use the first transcription data set, sound class \
+        system and transcription system.
+        :param workers: If specified, compute slices in a pool of `workers` processes.
+        """
+        self.manifest, self.computed = OrderedDict(), []
+        # Maps sound names to `dict`s describing the sound:
+        self.sounds = OrderedDict()
+        # BIPA is loaded before forking, thus workers inherit it.
+        TranscriptionSystem('bipa')
+        pool = process_pool(workers) if workers and workers > 1 else None
+        try:
+            bipa = snapshot.system_hash('bipa')
+            jobs = [('bipa', bipa, bipa_slice, ())]
+            for td in self.repos.iter_transcriptiondata():
+                jobs.append((
+                    'td-{0}'.format(td.id),
+                    [bipa, snapshot.file_hash([pkg_path('transcriptiondata', td.id + '.tsv')])],
+                    td_slice,
+                    (td,)))
+                if test:
+                    break
+
+            # Sounds are added in the order of the slices, i.e. a sound is described as
+            # in the first slice it appears in.
+            for slice_ in self.slices(jobs, pool=pool):
+                for name, sound in slice_['sounds']:
+                    if name not in self.sounds:
+                        self.sounds[name] = sound
+                for row in slice_['rows']:
+                    yield row
+            names = [[name, sound['generated']] for name, sound in self.sounds.items()]
+            names_hash = _hash(names)
+
+            # sound classes have a generative component, so we need to treat them
+            # separately
+            jobs = []
+            for sc in self.repos.iter_soundclass():
+                jobs.append((
+                    'sc-{0}'.format(sc.id),
+                    [
+                        bipa,
+                        names_hash,
+                        snapshot.file_hash([pkg_path('soundclasses', 'lingpy.tsv')])],
+                    sc_slice,
+                    (sc, names)))
+                if test:
+                    break
+
+            # last run, check again for each of the remaining transcription systems,
+            # whether we can translate the sound
+            for ts in self.repos.iter_transcriptionsystem(exclude=['bipa']):
+                jobs.append((
+                    'ts-{0}'.format(ts.id),
+                    [bipa, names_hash, snapshot.system_hash(ts.id)],
+                    ts_slice,
+                    (ts, names)))
+                if test:
+                    break
+            for slice_ in self.slices(jobs, pool=pool):
+                for row in slice_['rows']:
+                    yield row
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        if self.directory:
+            self._write_json(os.path.join(self.directory, 'manifest.json'), self.manifest)
+
+    def write(self, test=False, workers=None):
+        """
+        Write the tables. They are only replaced once both have been written completely.
+        """
+        with atomic_path(self.repos.data_path('graphemes.tsv')) as graphemes, \
+                atomic_path(self.repos.data_path('sounds.tsv')) as sounds:
+            with UnicodeWriter(graphemes, delimiter='\t') as writer:
+                writer.writerow([f.name for f in attr.fields(Grapheme)])
+                for row in self.iter_rows(test=test, workers=workers):
+                    writer.writerow(row)
+
+            with UnicodeWriter(sounds, delimiter='\t') as writer:
+                writer.writerow([
+                    'NAME', 'TYPE', 'GRAPHEME', 'UNICODE', 'GENERATED', 'NOTE'])
+                for k, v in sorted(self.sounds.items(), reverse=True):
+                    writer.writerow([
+                        k, v['type'], v['grapheme'], v['unicode'], v['generated'], v['note']])
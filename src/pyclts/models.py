@@ -8,7 +8,7 @@ from six import text_type
 import attr
 from clldutils.misc import UnicodeMixin, nfilter, lazyproperty
 
-from pyclts.util import norm
+from pyclts.util import norm, popcount
 
 __all__ = [
     'is_valid_sound',
@@ -40,15 +40,11 @@ EXCLUDE_FEATURES = [
 
 
 def is_valid_sound(sound, ts):
-    """Check the consistency of a given transcription system conversino"""
-    if isinstance(sound, (Marker, UnknownSound)):
-        return False
-    s1 = ts[sound.name]
-    s2 = ts[sound.s]
-    return s1.name == s2.name and s1.s == s2.s
+    """Check the consistency of a given transcription system conversion"""
+    return ts.is_valid(sound)
 
 
-@attr.s(cmp=False)
+@attr.s(cmp=False, frozen=True)
 class Symbol(UnicodeMixin):
     ts = attr.ib()
     grapheme = attr.ib()
@@ -60,6 +56,19 @@ class Symbol(UnicodeMixin):
     def type(self):
         return self.__class__.__name__.lower()
 
+    def _replace(self, **changes):
+        """
+        Create a copy of the symbol, sharing the values already computed for it, thus much
+        cheaper than `attr.evolve`.
+
+        Note: Only attributes the computed values do not depend on - i.e. `source` and
+        `normalized` - may be changed this way.
+        """
+        res = object.__new__(self.__class__)
+        res.__dict__.update(self.__dict__)
+        res.__dict__.update(changes)
+        return res
+
     def __unicode__(self):
         return self.grapheme
 
@@ -90,15 +99,20 @@ class Symbol(UnicodeMixin):
         return ' '.join('U+' + ('000' + hex(ord(x))[2:])[-4:] for x in self.__unicode__())
 
 
-@attr.s(cmp=False)
+@attr.s(cmp=False, frozen=True)
 class UnknownSound(Symbol):
     pass
 
 
-@attr.s(cmp=False, repr=False)
+@attr.s(cmp=False, repr=False, frozen=True)
 class Sound(Symbol):
     """
     Sound object stores basic features of the individual sound objects.
+
+    Sounds are immutable, thus the values derived from their features - `name`,
+    `featureset`, `featuredict` and the string representation `s` - are computed only
+    once, on first access. To change a sound, create a new one, e.g. using
+    `attr.evolve`, which will compute these values anew.
     """
     base = attr.ib(default=None)
     alias = attr.ib(default=None)
@@ -124,26 +138,45 @@ class Sound(Symbol):
     def __hash__(self):
         return hash(self.name)
 
-    @property
+    @lazyproperty
     def s(self):
-        return self.__unicode__()
+        return self._unicode()
 
     def _features(self):
         return nfilter(getattr(self, p, None) for p in self._name_order)
 
-    @property
+    @lazyproperty
     def featuredict(self):
         return {f: getattr(self, f, None) for f in self._name_order}
 
-    @property
+    @lazyproperty
     def featureset(self):
-        return frozenset(self._features() + [self.type])
+        res = frozenset(self._features() + [self.type])
+        # Sounds with the features of a sound of the system share its featureset - the
+        # key in the index - rather than each holding a copy.
+        canonical = getattr(self.ts, 'features', {}).get(res)
+        return res if canonical is None else canonical.featureset
+
+    @lazyproperty
+    def featurebits(self):
+        """The featureset encoded as bitmask, see `TranscriptionSystem.bitmask`."""
+        canonical = self.ts.features.get(self.featureset)
+        if canonical is not None and canonical is not self:
+            return canonical.featurebits
+        return self.ts.bitmask(self.featureset)
 
     def similarity(self, other):
+        if self.ts is other.ts and hasattr(self.ts, 'bitmask'):
+            b1, b2 = self.featurebits, other.featurebits
+            if b1 is not None and b2 is not None:
+                return popcount(b1 & b2) / popcount(b1 | b2)
         f1, f2 = self.featureset, other.featureset
         return len(f1.intersection(f2)) / len(f1.union(f2))
 
     def __unicode__(self):
+        return self.s
+
+    def _unicode(self):
         """
         Return the reference representation of the sound.
 
@@ -188,7 +221,7 @@ class Sound(Symbol):
                     norm(self.ts.features[self.type].get(getattr(self, p, ''), '<!>')))
         return ''.join(out)
 
-    @property
+    @lazyproperty
     def name(self):
         return ' '.join([f or '' for f in self._features()] + [self.type])
 
@@ -219,9 +252,10 @@ class Sound(Symbol):
         return tbl
 
 
-@attr.s(cmp=False)
+@attr.s(cmp=False, frozen=True)
 class Marker(Symbol):
     alias = attr.ib(default=None)
+    normalized = attr.ib(default=None)
     feature = attr.ib(default=None)
     value = attr.ib(default=None)
     unknown = attr.ib(default=None)
@@ -235,7 +269,7 @@ class Marker(Symbol):
         return frozenset([self.grapheme, self.type])
 
 
-@attr.s(cmp=False, repr=False)
+@attr.s(cmp=False, repr=False, frozen=True)
 class Consonant(Sound):
 
     # features follow basic information about IPA from various sources, they
@@ -286,15 +320,15 @@ class Consonant(Sound):
         'sibilancy', 'manner']
 
 
-@attr.s(cmp=False, repr=False)
+@attr.s(cmp=False, repr=False, frozen=True)
 class ComplexSound(Sound):
     from_sound = attr.ib(default=None)
     to_sound = attr.ib(default=None)
 
-    def __unicode__(self):
+    def _unicode(self):
         return self.from_sound.__unicode__() + self.to_sound.__unicode__()
 
-    @property
+    @lazyproperty
     def name(self):
         n1 = ' '.join(self.from_sound.name.split(' ')[:-1])
         n2 = ' '.join(self.to_sound.name.split(' ')[:-1])
@@ -318,7 +352,7 @@ class ComplexSound(Sound):
         return [self.grapheme, self.from_sound.name, self.to_sound.name]
 
 
-@attr.s(cmp=False, repr=False)
+@attr.s(cmp=False, repr=False, frozen=True)
 class Cluster(ComplexSound):
     """
     A cluster of two consonants whose manner is either plosive or implosive.
@@ -331,7 +365,7 @@ class Cluster(ComplexSound):
     """
 
 
-@attr.s(cmp=False, repr=False)
+@attr.s(cmp=False, repr=False, frozen=True)
 class Vowel(Sound):
     roundedness = attr.ib(default=None)
     height = attr.ib(default=None)
@@ -374,14 +408,14 @@ class Vowel(Sound):
         'tone']
 
 
-@attr.s(cmp=False, repr=False)
+@attr.s(cmp=False, repr=False, frozen=True)
 class Diphthong(ComplexSound):
     """
     A dipthong consists of two vowels.
     """
 
 
-@attr.s(cmp=False, repr=False)
+@attr.s(cmp=False, repr=False, frozen=True)
 class Tone(Sound):
     contour = attr.ib(default=None)
     start = attr.ib(default=None)
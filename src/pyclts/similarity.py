@@ -0,0 +1,78 @@
+# coding: utf-8
+"""
+Vectorized similarities between sounds, computed from a binary feature matrix.
+
+Note: This module requires numpy, e.g. installed via `pip install pyclts[numpy]`.
+"""
+from __future__ import unicode_literals, division
+
+__all__ = ['FeatureMatrix']
+
+
+class FeatureMatrix(object):
+    """
+    A binary matrix with one row per sound and one column per feature value.
+
+    Similarities are computed as Jaccard index of the featuresets of two sounds, i.e. the
+    same way as with `Sound.similarity`.
+    """
+    def __init__(self, sounds):
+        import numpy as np
+
+        self.sounds = list(sounds)
+        self.features = sorted(set().union(*[s.featureset for s in self.sounds]))
+        self._columns = {f: i for i, f in enumerate(self.features)}
+        self.matrix = np.zeros((len(self.sounds), len(self.features)), dtype=np.float32)
+        for i, sound in enumerate(self.sounds):
+            self.matrix[i, [self._columns[f] for f in sound.featureset]] = 1
+        self._sizes = self.matrix.sum(axis=1)
+
+    @classmethod
+    def from_system(cls, ts):
+        """
+        Create a matrix for all sounds of a transcription system, which are not aliases.
+        """
+        return cls(
+            s for s in ts.sounds.values()
+            if not s.alias and s.type in ['consonant', 'vowel', 'tone'])
+
+    def __len__(self):
+        return len(self.sounds)
+
+    def similarity(self):
+        """
+        :return: `numpy.ndarray` of shape `(len(self), len(self))` with the similarities \
+        of all pairs of sounds.
+        """
+        import numpy as np
+
+        intersection = np.dot(self.matrix, self.matrix.T)
+        return intersection / (self._sizes[:, None] + self._sizes[None, :] - intersection)
+
+    def similarities(self, sound):
+        """
+        :return: `numpy.ndarray` with the similarities of `sound` to all sounds in the \
+        matrix.
+        """
+        columns = [self._columns[f] for f in sound.featureset if f in self._columns]
+        intersection = self.matrix[:, columns].sum(axis=1)
+        return intersection / (self._sizes + len(sound.featureset) - intersection)
+
+    def nearest(self, sound, k=5):
+        """
+        Find the sounds which are most similar to `sound`.
+
+        :return: `list` of the `k` pairs `(sound, similarity)` with highest similarity, \
+        excluding sounds with the same name as `sound`.
+        """
+        import numpy as np
+
+        similarities = self.similarities(sound)
+        res = []
+        # mergesort is stable, so ties are broken by the order of the sounds.
+        for i in np.argsort(-similarities, kind='mergesort'):
+            if self.sounds[i].name != sound.name:
+                res.append((self.sounds[i], float(similarities[i])))
+                if len(res) == k:
+                    break
+        return res
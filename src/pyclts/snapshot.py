@@ -0,0 +1,168 @@
+# coding: utf-8
+"""
+Compiled snapshots of loaded transcription systems.
+
+Loading a transcription system from its TSV files means parsing the CSVW
+metadata, validating all features and compiling the lookup structures. To make
+this cheap for short-lived processes, the state of a loaded system is pickled
+to a user cache directory, together with a hash computed from the data files it
+was built from. A snapshot is only used if this hash still matches.
+
+The cache directory can be set with the environment variable
+``PYCLTS_CACHE_DIR``; setting it to the empty string disables snapshots.
+"""
+from __future__ import unicode_literals
+import os
+import sys
+import pickle
+import hashlib
+
+from clldutils.path import Path
+
+from pyclts.util import pkg_path, atomic_path
+
+__all__ = ['cache_dir', 'file_hash', 'system_hash', 'snapshot_path', 'dump', 'load']
+
+# Bump this whenever the layout of the pickled state changes.
+SNAPSHOT_VERSION = 4
+PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+# The modules defining the classes of the pickled objects. Snapshots are invalidated
+# whenever their code changes, since sounds carry cached, computed attributes.
+MODULES = ['models.py', 'transcriptionsystem.py', 'util.py', 'snapshot.py']
+
+# The attributes of a TranscriptionSystem which make up its state.
+STATE = [
+    'features',
+    '_feature_values',
+    'diacritics',
+    'sound_classes',
+    'columns',
+    'sounds',
+    '_normalize',
+    '_feature_bits',
+]
+
+
+def cache_dir(*comps):
+    """Return the pyclts user cache directory or `None` if caching is disabled."""
+    path = os.environ.get('PYCLTS_CACHE_DIR')
+    if path is None:
+        if sys.platform.startswith('win'):  # pragma: no cover
+            base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+        else:
+            base = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+                os.path.expanduser('~'), '.cache')
+        path = os.path.join(base, 'pyclts')
+    if not path:
+        return None
+    return os.path.join(path, *comps)
+
+
+def file_hash(paths, *extra):
+    """Compute a SHA1 hash over the content of `paths` and additional strings."""
+    sha = hashlib.sha1()
+    for s in extra:
+        sha.update('{0}\n'.format(s).encode('utf8'))
+    for path in paths:
+        sha.update(path.name.encode('utf8'))
+        with path.open('rb') as fp:
+            sha.update(fp.read())
+    return sha.hexdigest()
+
+
+def system_hash(id_):
+    """
+    Compute the hash of the data files a transcription system is built from and of the
+    code of the modules defining the pickled objects.
+    """
+    paths = sorted(
+        (p for p in pkg_path('transcriptionsystems', id_).iterdir() if p.is_file()),
+        key=lambda p: p.name)
+    paths.extend([
+        pkg_path('transcriptionsystems', 'transcription-system-metadata.json'),
+        pkg_path('transcriptionsystems', 'features.json')])
+    paths.extend(Path(__file__).parent / name for name in MODULES)
+    return file_hash(
+        paths, SNAPSHOT_VERSION, PROTOCOL, '{0}.{1}'.format(*sys.version_info[:2]))
+
+
+def snapshot_path(id_, directory=None):
+    """
+    :return: The path of the snapshot of a system within the cache directory, or `None` \
+    if caching is disabled. Snapshots of systems outside the package - i.e. with a path \
+    as `id_` - are keyed by a hash of the resolved path of the system.
+    """
+    directory = directory or cache_dir('snapshots')
+    if directory:
+        system = pkg_path('transcriptionsystems', id_).resolve()
+        name = system.name
+        if system.parent != pkg_path('transcriptionsystems').resolve():
+            name = '{0}-{1}'.format(
+                name, hashlib.sha1(str(system).encode('utf8')).hexdigest()[:16])
+        return os.path.join(directory, '{0}.pickle'.format(name))
+
+
+class _Pickler(pickle.Pickler):
+    """Pickles the back-references of sounds to their system as persistent IDs."""
+    def __init__(self, fp, ts):
+        pickle.Pickler.__init__(self, fp, PROTOCOL)
+        self.ts = ts
+
+    def persistent_id(self, obj):
+        return 'ts' if obj is self.ts else None
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, fp, ts):
+        pickle.Unpickler.__init__(self, fp)
+        self.ts = ts
+
+    def persistent_load(self, pid):
+        if pid != 'ts':  # pragma: no cover
+            raise pickle.UnpicklingError('unsupported persistent id: {0}'.format(pid))
+        return self.ts
+
+
+def dump(ts, directory=None):
+    """
+    Write a snapshot of the loaded transcription system `ts`.
+
+    :return: The path of the snapshot or `None` if it could not be written.
+    """
+    path = snapshot_path(ts.id, directory=directory)
+    if not path:
+        return
+    try:
+        with atomic_path(path) as tmp:
+            with open(tmp, 'wb') as fp:
+                pickler = _Pickler(fp, ts)
+                pickler.dump(dict(version=SNAPSHOT_VERSION, hash=system_hash(ts.id)))
+                pickler.dump({attr: getattr(ts, attr) for attr in STATE})
+    except (IOError, OSError, pickle.PicklingError):  # pragma: no cover
+        return
+    return path
+
+
+def load(ts, directory=None):
+    """
+    Initialize the transcription system `ts` from its snapshot.
+
+    :return: `True` if an up-to-date snapshot was found and loaded, else `False`.
+    """
+    path = snapshot_path(ts.id, directory=directory)
+    if not (path and os.path.exists(path)):
+        return False
+    try:
+        with open(path, 'rb') as fp:
+            unpickler = _Unpickler(fp, ts)
+            header = unpickler.load()
+            if header != dict(version=SNAPSHOT_VERSION, hash=system_hash(ts.id)):
+                return False
+            state = unpickler.load()
+    except Exception:  # pragma: no cover
+        # A corrupt or incompatible snapshot is simply ignored.
+        return False
+    for attr in STATE:
+        setattr(ts, attr, state[attr])
+    return True
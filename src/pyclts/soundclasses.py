@@ -1,8 +1,11 @@
 # coding: utf-8
 from __future__ import unicode_literals
 
+from six import string_types
+from clldutils.misc import lazyproperty
+
 from pyclts.transcriptionsystem import Symbol, TranscriptionSystem
-from pyclts.util import read_data, TranscriptionBase
+from pyclts.util import read_data, TranscriptionBase, pkg_path
 
 SOUNDCLASS_SYSTEMS = ['sca', 'cv', 'art', 'dolgo', 'asjp', 'color']
 
@@ -23,19 +26,10 @@ class SoundClasses(TranscriptionBase):
                 self.data[k] = v[0]
                 self.classes.add(v[0]['grapheme'])
             self.system = TranscriptionSystem('bipa')
+            # sound classes of sounds not in the data, by sound name
+            self._backoff = {}
 
-    def resolve_sound(self, sound):
-        """Function tries to identify a sound in the data.
-
-        Notes
-        -----
-        The function tries to resolve sounds to take a sound with less complex
-        features in order to yield the next approximate sound class, if the
-        transcription data are sound classes.
-        """
-        sound = sound if isinstance(sound, Symbol) else self.system[sound]
-        if sound.name in self.data:
-            return self.data[sound.name]['grapheme']
+    def _back_off(self, sound):
         if not sound.type == 'unknownsound':
             if sound.type in ['diphthong', 'cluster']:
                 return self.resolve_sound(sound.from_sound)
@@ -48,4 +42,80 @@ class SoundClasses(TranscriptionBase):
                 if sound and sound.name in self.data:
                     return self.resolve_sound(sound)
                 name.pop(0)
-        raise KeyError(":sc:resolve_sound: No sound could be found.")
+
+    def resolve_sound(self, sound):
+        """Function tries to identify a sound in the data.
+
+        Notes
+        -----
+        The function tries to resolve sounds to take a sound with less complex
+        features in order to yield the next approximate sound class, if the
+        transcription data are sound classes. The result of this back-off is
+        memoized per sound name.
+        """
+        sound = sound if isinstance(sound, Symbol) else self.system[sound]
+        if sound.name in self.data:
+            return self.data[sound.name]['grapheme']
+        try:
+            res = self._backoff[sound.name]
+        except KeyError:
+            res = self._backoff[sound.name] = self._back_off(sound)
+        if res is None:
+            raise KeyError(":sc:resolve_sound: No sound could be found.")
+        return res
+
+    @lazyproperty
+    def vocabulary(self):
+        """
+        A stable mapping of sound classes to positive integers; 0 is reserved for sounds
+        which cannot be resolved.
+        """
+        return {c: i + 1 for i, c in enumerate(sorted(self.classes))}
+
+    def encode(self, words, ragged=False):
+        """
+        Encode segmented words as integer arrays of sound classes, see `vocabulary`.
+
+        Note: This method requires numpy.
+
+        :param words: Iterable of words, each given as string of whitespace-separated \
+        segments or as list of segments.
+        :param ragged: If `True`, return a pair `(values, offsets)` of arrays, where \
+        `values` holds the codes of all segments of all words and the codes of the i-th \
+        word are `values[offsets[i]:offsets[i + 1]]`.
+        :return: `list` of `numpy.ndarray`, one per word.
+        """
+        import numpy as np
+
+        segments, lengths = [], [0]
+        for word in words:
+            word = word.split() if isinstance(word, string_types) else word
+            segments.extend(word)
+            lengths.append(len(word))
+        indices, table = self.resolve_many(segments, default=None, index=True)
+        codes = np.array([self.vocabulary.get(c, 0) for c in table], dtype=np.int32)
+        values = codes[np.array(indices, dtype=np.intp)] if segments else codes
+        offsets = np.cumsum(lengths, dtype=np.int64)
+        if ragged:
+            return values, offsets
+        return np.split(values, offsets[1:-1]) if len(lengths) > 1 else []
+
+    def precompute(self, names=None):
+        """
+        Compute the sound classes for a list of sound names in advance.
+
+        :param names: Iterable of sound names, defaulting to the names of all sounds in \
+        all transcription data.
+        """
+        if names is None:
+            from pyclts.transcriptiondata import TranscriptionData
+
+            names = set()
+            for td in sorted(pkg_path('transcriptiondata').iterdir(), key=lambda p: p.name):
+                names.update(TranscriptionData(td.stem).names)
+        for name in sorted(names):
+            try:
+                self.get(name)
+            except ValueError:
+                # Not a valid sound name.
+                pass
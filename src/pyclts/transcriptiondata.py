@@ -1,7 +1,7 @@
 # coding: utf-8
 from __future__ import unicode_literals
 
-from pyclts.util import read_data, TranscriptionBase
+from pyclts.util import read_data, TranscriptionBase, nfd
 from pyclts.transcriptionsystem import Sound, TranscriptionSystem
 
 
@@ -29,6 +29,45 @@ class TranscriptionData(TranscriptionBase):
                 'EXPLICIT'
             )
             self.system = TranscriptionSystem('bipa')
+            # Inverted index, mapping graphemes of the dataset to CLTS names:
+            self.graphemes = {}
+            for name in self.names:
+                if name != '<NA>':
+                    for item in self.data[name]:
+                        self.graphemes.setdefault(item['grapheme'], name)
+
+    def name_from_grapheme(self, grapheme):
+        """
+        :param grapheme: A grapheme as used in the dataset.
+        :return: The CLTS name of the sound the grapheme is mapped to.
+        :raises KeyError: If the grapheme is not mapped to a sound.
+        """
+        try:
+            return self.graphemes[grapheme]
+        except KeyError:
+            return self.graphemes[nfd(grapheme)]
+
+    def from_grapheme(self, grapheme):
+        """
+        :return: The BIPA sound a grapheme of the dataset is mapped to.
+        """
+        return self.system[self.name_from_grapheme(grapheme)]
+
+    def convert_inventory(self, graphemes, default=None):
+        """
+        Map an inventory given in graphemes of the dataset to BIPA sounds.
+
+        :param graphemes: Iterable of graphemes.
+        :param default: Value to use for graphemes which are not mapped to a sound.
+        :return: `list` of BIPA sounds.
+        """
+        res = []
+        for grapheme in graphemes:
+            try:
+                res.append(self.from_grapheme(grapheme))
+            except KeyError:
+                res.append(default)
+        return res
 
     def resolve_sound(self, sound):
         """Function tries to identify a sound in the data.
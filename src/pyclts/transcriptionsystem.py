@@ -5,21 +5,43 @@ Transcription System module for consistent IPA handling.
 
 """
 from __future__ import unicode_literals
-import re
+from itertools import islice
 
 from six import text_type
 
 from csvw import TableGroup
 from clldutils import jsonlib
+from clldutils.misc import lazyproperty
 import attr
 
-from pyclts.util import pkg_path, nfd, norm, EMPTY, itertable, TranscriptionBase
+from pyclts.util import (
+    pkg_path, nfd, norm, EMPTY, itertable, TranscriptionBase, LRUCache, Trie, ParseStats,
+)
+from pyclts import snapshot
 from pyclts.models import *  # noqa: F403
 
 
 class TranscriptionSystem(TranscriptionBase):
     """
-    A transcription System."""
+    A transcription System.
+
+    Resolved sounds are kept in an LRU cache, keyed by the string passed to
+    `resolve_sound`. The size of this cache can be changed per system, using
+    `ts.cache.resize(maxsize)`, or for all systems loaded subsequently, by setting
+    `TranscriptionSystem.cache_size`.
+
+    Resolving sounds does not modify the system: sound objects are immutable and each
+    lookup of a string returns its own result. Thus, a loaded system can be shared by
+    multiple threads (see `TranscriptionBase.map`).
+
+    Counters and timings of the branches taken by `_parse` and `_from_name` - and of
+    lookups answered from the cache, as branch `cache` of `resolve_sound` - are recorded
+    in `ts.stats` (see `ParseStats`), once enabled with `ts.stats.enable()`, or for all
+    systems loaded subsequently, by setting `TranscriptionSystem.profile = True`.
+    """
+    cache_size = 100000
+    profile = False
+
     def __init__(self, id_):
         """
         :param system: The name of a transcription system or a directory containing one.
@@ -32,9 +54,13 @@ class TranscriptionSystem(TranscriptionBase):
         if not (system.exists() and system.is_dir()):
             raise ValueError('unknown system: {0}'.format(id_))
 
-        self.system = TableGroup.from_file(
-            pkg_path('transcriptionsystems', 'transcription-system-metadata.json'))
-        self.system._fname = system / 'metadata.json'
+        self.cache = LRUCache(maxsize=self.cache_size)
+        self.stats = ParseStats(enabled=self.profile)
+        # Memoized results of `is_valid`, keyed by pairs (name, grapheme) of sounds:
+        self._valid = {}
+        if snapshot.load(self):
+            self._update_trie()
+            return
 
         self.features = {'consonant': {}, 'vowel': {}, 'tone': {}}
         # dictionary for feature values, checks when writing elements from
@@ -103,18 +129,56 @@ class TranscriptionSystem(TranscriptionBase):
             raise ValueError(
                 'Orphaned aliases in line(s) {0}'.format(error))
 
-        # basic regular expression, used to match the basic sounds in the system.
-        self._regex = None
-        self._update_regex()
+        # prefix tree, used to match the basic sounds in the system.
+        self._trie = None
+        self._update_trie()
 
         # normalization data
         self._normalize = {
             norm(r['source']): norm(r['target'])
             for r in itertable(self.system.tabledict['normalize.tsv'])}
 
-    def _update_regex(self):
-        self._regex = re.compile('|'.join(
-            map(re.escape, sorted(self.sounds, key=lambda x: len(x), reverse=True))))
+        # integer bits for all feature values and sound types, used to encode featuresets
+        # as bitmasks
+        self._feature_bits = {
+            value: 1 << i for i, value in enumerate(sorted(
+                set(self._feature_values).union(self.sound_classes, ['diphthong', 'cluster'])))}
+
+        # Compute the names and strings of all sounds, which are shared by the copies
+        # returned by lookups (and stored in the snapshot).
+        for sound in self.sounds.values():
+            if isinstance(sound, Sound):  # noqa: F405
+                _ = sound.name, sound.s
+        snapshot.dump(self)
+
+    @lazyproperty
+    def system(self):
+        """The CSVW TableGroup describing the data files of the system."""
+        system = TableGroup.from_file(
+            pkg_path('transcriptionsystems', 'transcription-system-metadata.json'))
+        system._fname = pkg_path('transcriptionsystems', self.id, 'metadata.json')
+        return system
+
+    def _update_trie(self):
+        self._trie = Trie(self.sounds)
+
+    def bitmask(self, values):
+        """
+        Encode a set of feature values as integer bitmask.
+
+        :return: `int` or `None`, if any of the values is unknown to the system.
+        """
+        res = 0
+        for value in values:
+            bit = self._feature_bits.get(value)
+            if bit is None:
+                return None
+            res |= bit
+        return res
+
+    def feature_values(self, bitmask):
+        """Decode a bitmask created with `bitmask`."""
+        return frozenset(v for v, bit in self._feature_bits.items() if bitmask & bit)
 
     def _norm(self, string):
         """Extended normalization: normalize by list of norm-characers, split
@@ -131,9 +195,25 @@ class TranscriptionSystem(TranscriptionBase):
 
     def _from_name(self, string):
         """Parse a sound from its name"""
+        if not self.stats.enabled:
+            return self._from_name_branch(string)[1]
+        return self._instrumented('_from_name', self._from_name_branch, string)
+
+    def _instrumented(self, method, func, string):
+        start, branch = self.stats.timer(), 'error'
+        try:
+            branch, res = func(string)
+            return res
+        finally:
+            self.stats.record(method, branch, self.stats.timer() - start)
+
+    def _from_name_branch(self, string):
+        """
+        :return: Pair `(branch, sound)`, where `branch` names the way the sound was found.
+        """
         components = string.split(' ')
         if frozenset(components) in self.features:
-            return self.features[frozenset(components)]
+            return 'direct', self.features[frozenset(components)]
         rest, sound_class = components[:-1], components[-1]
         if sound_class in ['diphthong', 'cluster']:
             if string.startswith('from ') and 'to ' in string:
@@ -145,9 +225,11 @@ class TranscriptionSystem(TranscriptionBase):
                 if v1 in self.features and v2 in self.features:
                     s1, s2 = (self.features[v1], self.features[v2])
                     if sound_class == 'diphthong':
-                        return Diphthong.from_sounds(s1 + s2, s1, s2, self)  # noqa: F405
+                        return 'complex', Diphthong.from_sounds(  # noqa: F405
+                            s1 + s2, s1, s2, self)
                     else:
-                        return Cluster.from_sounds(s1 + s2, s1, s2, self)  # noqa: F405
+                        return 'complex', Cluster.from_sounds(  # noqa: F405
+                            s1 + s2, s1, s2, self)
                 else:
                     # try to generate the sounds if they are not there
                     s1, s2 = self._from_name(from_ + ' ' + extension), self._from_name(
@@ -155,9 +237,10 @@ class TranscriptionSystem(TranscriptionBase):
                     if not (isinstance(
                         s1, UnknownSound) or isinstance(s2, UnknownSound)):  # noqa: F405
                         if sound_class == 'diphthong':
-                            return Diphthong.from_sounds(  # noqa: F405
+                            return 'complex-generated', Diphthong.from_sounds(  # noqa: F405
                                 s1 + s2, s1, s2, self)
-                        return Cluster.from_sounds(s1 + s2, s1, s2, self)  # noqa: F405
+                        return 'complex-generated', Cluster.from_sounds(  # noqa: F405
+                            s1 + s2, s1, s2, self)
                     raise ValueError('components could not be found in system')
             else:
                 raise ValueError('name string is erroneously encoded')
@@ -172,11 +255,15 @@ class TranscriptionSystem(TranscriptionBase):
         args['ts'] = self
         sound = self.sound_classes[sound_class](**args)
         if sound.featureset not in self.features:
-            sound.generated = True
-            return sound
-        return self.features[sound.featureset]
+            return 'generated', attr.evolve(sound, generated=True)
+        return 'features', self.features[sound.featureset]
 
     def _parse(self, string):
+        if not self.stats.enabled:
+            return self._parse_branch(string)[1]
+        return self._instrumented('_parse', self._parse_branch, string)
+
+    def _parse_branch(self, string):
         """Parse a string and return its features.
 
         :param string: A one-symbol string in NFD
@@ -187,22 +274,24 @@ class TranscriptionSystem(TranscriptionBase):
         then search left and right of this part for the additional features as
         expressed by the diacritics. Fails if a segment has more than one basic
         part.
+
+        :return: Pair `(branch, sound)`, where `branch` names the way the sound was found.
         """
         nstring = self._norm(string)
 
         # check whether sound is in self.sounds
         if nstring in self.sounds:
-            sound = self.sounds[nstring]
-            sound.normalized = nstring != string
-            sound.source = string
-            return sound
+            # We return a copy, since sounds in self.sounds are shared by all lookups.
+            return 'normalized' if nstring != string else 'direct', self.sounds[
+                nstring]._replace(normalized=nstring != string, source=string)
 
-        match = list(self._regex.finditer(nstring))
+        # We only need to know whether there are zero, one, two or more matches.
+        match = list(islice(self._trie.finditer(nstring), 3))
         # if the match has length 2, we assume that we have two sounds, so we split
         # the sound and pass it on for separate evaluation (recursive function)
         if len(match) == 2:
-            sound1 = self._parse(nstring[:match[1].start()])
-            sound2 = self._parse(nstring[match[1].start():])
+            sound1 = self._parse(nstring[:match[1][0]])
+            sound2 = self._parse(nstring[match[1][0]:])
             # if we have ANY unknown sound, we mark the whole sound as unknown, if
             # we have two known sounds of the same type (vowel or consonant), we
             # either construct a diphthong or a cluster
@@ -210,24 +299,27 @@ class TranscriptionSystem(TranscriptionBase):
                     sound1.type == sound2.type:
                 # diphthong creation
                 if sound1.type == 'vowel':
-                    return Diphthong.from_sounds(  # noqa: F405
+                    return 'split', Diphthong.from_sounds(  # noqa: F405
                         string, sound1, sound2, self)
                 elif sound1.type == 'consonant' and \
                         sound1.manner in ('stop', 'implosive', 'click', 'nasal') and \
                         sound2.manner in ('stop', 'implosive', 'affricate', 'fricative'):
-                    return Cluster.from_sounds(  # noqa: F405
+                    return 'split', Cluster.from_sounds(  # noqa: F405
                         string, sound1, sound2, self)
-            return UnknownSound(grapheme=nstring, source=string, ts=self)  # noqa: F405
+            return 'unknown', UnknownSound(  # noqa: F405
+                grapheme=nstring, source=string, ts=self)
 
         if len(match) != 1:
             # Either no match or more than one; both is considered an error.
-            return UnknownSound(grapheme=nstring, source=string, ts=self)  # noqa: F405
+            return 'unknown', UnknownSound(  # noqa: F405
+                grapheme=nstring, source=string, ts=self)
 
-        pre, mid, post = nstring.partition(nstring[match[0].start():match[0].end()])
+        pre, mid, post = nstring.partition(nstring[match[0][0]:match[0][1]])
         base_sound = self.sounds[mid]
         if isinstance(base_sound, Marker):  # noqa: F405
             assert pre or post
-            return UnknownSound(grapheme=nstring, source=string, ts=self)  # noqa: F405
+            return 'marker', UnknownSound(  # noqa: F405
+                grapheme=nstring, source=string, ts=self)
 
         # A base sound with diacritics or a custom symbol.
         features = attr.asdict(base_sound)
@@ -244,7 +336,7 @@ class TranscriptionSystem(TranscriptionBase):
         for dia in [p + EMPTY for p in pre]:
             feature = self.diacritics[base_sound.type].get(dia, {})
             if not feature:
-                return UnknownSound(  # noqa: F405
+                return 'unknown', UnknownSound(  # noqa: F405
                     grapheme=nstring, source=string, ts=self)
             features[self._feature_values[feature]] = feature
             # we add the unaliased version to the grapheme
@@ -259,7 +351,7 @@ class TranscriptionSystem(TranscriptionBase):
             # we are strict: if we don't know the feature, it's an unknown
             # sound
             if not feature:
-                return UnknownSound(  # noqa: F405
+                return 'unknown', UnknownSound(  # noqa: F405
                     grapheme=nstring, source=string, ts=self)
             features[self._feature_values[feature]] = feature
             grapheme += dia[1]
@@ -268,23 +360,141 @@ class TranscriptionSystem(TranscriptionBase):
         features['grapheme'] = sound
         new_sound = self.sound_classes[base_sound.type](**features)
         # check whether grapheme differs from re-generated sound
+        changes = {}
         if text_type(new_sound) != sound:
-            new_sound.alias = True
+            changes['alias'] = True
         if grapheme != sound:
-            new_sound.alias = True
-            new_sound.grapheme = grapheme
-        return new_sound
+            changes.update(alias=True, grapheme=grapheme)
+        return 'diacritics', attr.evolve(new_sound, **changes) if changes else new_sound
+
+    def _split(self, string):
+        """
+        Split a normalized string into substrings with one base sound each.
+
+        Diacritics following a base sound are attached to it, diacritics preceding a
+        base sound are attached to it unless they can follow the preceding one.
+        Characters which cannot be attached form substrings of their own.
+        """
+        segments, pos = [], 0
+        for start, end in self._trie.finditer(string):
+            type_ = self.sounds[string[start:end]].type
+            if segments and segments[-1][2]:
+                post = self.diacritics.get(segments[-1][2], {})
+                while pos < start and EMPTY + string[pos] in post:
+                    pos += 1
+                segments[-1][1] = pos
+            pre, begin = self.diacritics.get(type_, {}), start
+            while begin > pos and string[begin - 1] + EMPTY in pre:
+                begin -= 1
+            if begin > pos:
+                segments.append([pos, begin, None])
+            segments.append([begin, end, type_])
+            pos = end
+        if segments and segments[-1][2]:
+            post = self.diacritics.get(segments[-1][2], {})
+            while pos < len(string) and EMPTY + string[pos] in post:
+                pos += 1
+            segments[-1][1] = pos
+        if pos < len(string):
+            segments.append([pos, len(string), None])
+        return [string[start:end] for start, end, _ in segments]
+
+    def segment(self, word, diphthongs=True, clusters=False):
+        """
+        Segment an unsegmented string into sounds in one left-to-right pass.
+
+        :param word: A string in IPA, whitespace is treated as segment boundary.
+        :param diphthongs: Flag signaling whether to merge sequences of two vowels into \
+        diphthongs.
+        :param clusters: Flag signaling whether to merge sequences of two consonants into \
+        clusters, where `_parse` would do so.
+        :return: `list` of sound objects.
+        """
+        merge = set()
+        if diphthongs:
+            merge.add('vowel')
+        if clusters:
+            merge.add('consonant')
+        res = []
+        for part in norm(self.normalize(word)).split():
+            first = len(res)
+            for segment in self._split(part):
+                sound = self[segment]
+                if len(res) > first and sound.type in merge and res[-1].type == sound.type:
+                    complex_sound = self[res[-1].source + segment]
+                    if complex_sound.type in ('diphthong', 'cluster'):
+                        res[-1] = complex_sound
+                        continue
+                res.append(sound)
+        return res
+
+    def iter_segments(self, words, **kw):
+        """
+        Segment a stream of words.
+
+        :param words: Iterable of unsegmented strings.
+        :param kw: Keyword arguments passed into `segment`.
+        :return: Generator of `list`s of sound objects.
+        """
+        for word in words:
+            yield self.segment(word, **kw)
 
     def resolve_sound(self, string):
         if isinstance(string, Sound):  # noqa: F405
             return self.features[string.featureset]
         elif isinstance(string, Symbol):  # noqa: F405
             return string
-        if set(string.split(' ')).intersection(
-                list(self.sound_classes) + ['diphthong', 'cluster']):
-            return self._from_name(string)
-        string = nfd(string)
-        return self._parse(string)
+        start = self.stats.timer() if self.stats.enabled else None
+        sound = self.cache.get(string)
+        if sound is None:
+            if set(string.split(' ')).intersection(
+                    list(self.sound_classes) + ['diphthong', 'cluster']):
+                sound = self._from_name(string)
+            else:
+                sound = self._parse(nfd(string))
+            self.cache.set(string, sound)
+        elif start is not None:
+            # Cache hits never reach `_parse` or `_from_name`, thus are recorded here.
+            self.stats.record('resolve_sound', 'cache', self.stats.timer() - start)
+        return sound
+
+    def is_valid(self, sound):
+        """
+        Check the consistency of a sound in the system, i.e. whether its name and its
+        grapheme resolve to the same sound.
+
+        :param sound: A sound or a string - a grapheme or a name - which is resolved first.
+        :return: `bool`
+        """
+        try:
+            if not isinstance(sound, Symbol):  # noqa: F405
+                sound = self[sound]
+            if isinstance(sound, (Marker, UnknownSound)):  # noqa: F405
+                return False
+            key = (sound.name, sound.s)
+            res = self._valid.get(key)
+            if res is None:
+                s1, s2 = self[sound.name], self[sound.s]
+                res = self._valid[key] = s1.name == s2.name and s1.s == s2.s
+            return res
+        except (ValueError, TypeError):
+            # A name of a sound the system cannot generate.
+            return False
+
+    def audit(self, sounds):
+        """
+        Check the consistency of many sounds at once.
+
+        :param sounds: Iterable of sounds or strings, see `is_valid`.
+        :return: `list` of the distinct items of `sounds` which are not valid.
+        """
+        res, seen = [], set()
+        for sound in sounds:
+            if sound not in seen:
+                seen.add(sound)
+                if not self.is_valid(sound):
+                    res.append(sound)
+        return res
 
     def __contains__(self, item):
         if isinstance(item, Sound):  # noqa: F405
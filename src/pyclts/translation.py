@@ -0,0 +1,93 @@
+# coding: utf-8
+"""
+Tables mapping sound names to graphemes in a target system, used for translation.
+"""
+from __future__ import unicode_literals
+
+from clldutils import jsonlib
+
+__all__ = ['TranslationTable']
+
+
+class TranslationTable(object):
+    """
+    A mapping of sound names to their representation in a target system.
+
+    Names which are not in the table are resolved on demand in the target system, if
+    one is given, and added to the table.
+    """
+    def __init__(self, target=None, mapping=None):
+        """
+        :param target: The target system, i.e. a `TranscriptionSystem`, `SoundClasses` or \
+        `TranscriptionData` instance.
+        :param mapping: `dict` mapping sound names to graphemes.
+        """
+        self.target = target
+        self.mapping = mapping or {}
+
+    def __len__(self):
+        return len(self.mapping)
+
+    def __contains__(self, name):
+        return name in self.mapping
+
+    def __getitem__(self, name):
+        try:
+            return self.mapping[name]
+        except KeyError:
+            if self.target is None:
+                raise
+            res = self.mapping[name] = '{0}'.format(self.target.get(name, '?'))
+            return res
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def names(self):
+        """
+        :return: The names of all sounds of the target system and of the sounds in BIPA.
+        """
+        from pyclts.transcriptionsystem import TranscriptionSystem
+
+        res = []
+        for ts in [TranscriptionSystem('bipa'), self.target]:
+            if hasattr(ts, 'features'):
+                res.extend(
+                    s.name for s in ts.sounds.values()
+                    if not s.alias and s.type != 'marker')
+            else:
+                res.extend(ts.names)
+        return sorted(set(res))
+
+    def precompute(self, names=None):
+        """
+        Add the representations of sounds to the table.
+
+        Sounds which a target transcription system cannot represent - i.e. which it fails \
+        to generate or which are not valid in the system (see \
+        `TranscriptionSystem.is_valid`) - are skipped.
+
+        :param names: Iterable of sound names, defaulting to `names()`.
+        """
+        validate = getattr(self.target, 'is_valid', None)
+        for name in (self.names() if names is None else names):
+            if name in self.mapping:
+                continue
+            if validate and not validate(name):
+                continue
+            try:
+                self[name]
+            except ValueError:
+                # The target system cannot generate a sound with this name.
+                pass
+        return self
+
+    @classmethod
+    def from_json(cls, path, target=None):
+        return cls(target=target, mapping=jsonlib.load(path))
+
+    def to_json(self, path):
+        jsonlib.dump(self.mapping, path, indent=0, sort_keys=True)
@@ -2,20 +2,212 @@
 """Auxiliary functions for pyclts."""
 
 from __future__ import unicode_literals, print_function, division
+import os
 import unicodedata
-from collections import defaultdict
+import threading
+import functools
+import bisect
+import contextlib
+from timeit import default_timer
+from array import array
+from collections import defaultdict, OrderedDict
 
 from six import text_type
 
 from clldutils.path import Path
 from csvw.dsv import reader
 
-__all__ = ['EMPTY', 'UNKNOWN', 'pkg_path', 'norm', 'nfd']
+from pyclts.translation import TranslationTable
+
+__all__ = [
+    'EMPTY', 'UNKNOWN', 'pkg_path', 'norm', 'nfd', 'atomic_path', 'LRUCache', 'Trie',
+    'ParseStats']
 
 EMPTY = "◌"
 UNKNOWN = "�"
 
 
+class LRUCache(object):
+    """
+    A thread-safe mapping of bounded size, discarding the least recently used items.
+
+    :param maxsize: Maximal number of items to keep, `None` for an unbounded cache and \
+    `0` to disable caching.
+    """
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            # Re-insert the item to mark it as most recently used:
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            if self.maxsize == 0:
+                return
+            self._data.pop(key, None)
+            self._data[key] = value
+            self._evict()
+
+    def _evict(self):
+        while self.maxsize is not None and len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        """Remove all items from the cache and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    @property
+    def stats(self):
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            size=len(self._data),
+            maxsize=self.maxsize)
+
+
+class ParseStats(object):
+    """
+    Counters and timing histograms of the branches taken when resolving sounds.
+
+    Statistics are keyed by pairs `(method, branch)`. Timings are sorted into buckets
+    with upper bounds `BUCKETS` (in seconds), with a last bucket for longer timings.
+    Recording is thread-safe. When disabled, nothing is recorded.
+    """
+    BUCKETS = tuple(1e-6 * 4 ** i for i in range(8))
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.counts = defaultdict(int)
+            self.times = defaultdict(float)
+            self.histograms = defaultdict(lambda: [0] * (len(self.BUCKETS) + 1))
+
+    @staticmethod
+    def timer():
+        return default_timer()
+
+    def record(self, method, branch, seconds):
+        key = (method, branch)
+        with self._lock:
+            self.counts[key] += 1
+            self.times[key] += seconds
+            self.histograms[key][bisect.bisect_left(self.BUCKETS, seconds)] += 1
+
+    def as_dict(self):
+        """
+        :return: `dict` mapping `method:branch` keys to `dict`s with keys `count`, \
+        `seconds` (the total time) and `histogram` (the counts per bucket).
+        """
+        with self._lock:
+            return {
+                '{0}:{1}'.format(*key): dict(
+                    count=count,
+                    seconds=self.times[key],
+                    histogram=list(self.histograms[key]))
+                for key, count in self.counts.items()}
+
+    def table(self):
+        """
+        :return: `list` of rows `(method, branch, count, total ms, mean us)`.
+        """
+        with self._lock:
+            return [
+                (method, branch, count, self.times[(method, branch)] * 1e3,
+                 self.times[(method, branch)] / count * 1e6)
+                for (method, branch), count in sorted(self.counts.items())]
+
+
+class Trie(object):
+    """
+    A prefix tree of strings, supporting longest-match search in linear time.
+    """
+    def __init__(self, strings=None):
+        self._root = {}
+        for string in strings or []:
+            self.add(string)
+
+    def add(self, string):
+        node = self._root
+        for char in string:
+            node = node.setdefault(char, {})
+        # `None` marks the end of a string in the trie.
+        node[None] = True
+
+    def __contains__(self, string):
+        node = self._root
+        for char in string:
+            node = node.get(char)
+            if node is None:
+                return False
+        return None in node
+
+    def longest_match(self, string, start=0):
+        """
+        :return: The end of the longest string in the trie starting at `start` in `string` \
+        or `None`.
+        """
+        node, end = self._root, None
+        for i in range(start, len(string)):
+            node = node.get(string[i])
+            if node is None:
+                break
+            if None in node:
+                end = i + 1
+        return end
+
+    def finditer(self, string):
+        """
+        Scan `string` from left to right for non-overlapping longest matches.
+
+        :return: Generator of `(start, end)` spans of the matches.
+        """
+        i, length = 0, len(string)
+        while i < length:
+            end = self.longest_match(string, i)
+            if end is None:
+                i += 1
+            else:
+                yield i, end
+                i = end
+
+
 class TranscriptionBase(object):
     #
     # This base class makes sure only one instance per (sub-class, id_) is created.
@@ -34,6 +226,21 @@ class TranscriptionBase(object):
         cls.__instances[key].id = id_
         return cls.__instances[key]
 
+    @classmethod
+    def instances(cls):
+        """
+        :return: `list` of the instances of `cls` created so far, sorted by ID.
+        """
+        return [
+            obj for (name, _), obj in sorted(cls.__instances.items())
+            if name == cls.__name__]
+
+    def __reduce__(self):
+        # Instances are pickled by reference, so that pickling a sound (which refers to its
+        # transcription system) is cheap, and unpickling it yields the instance of the
+        # current process.
+        return self.__class__, (self.id,)
+
     def resolve_sound(self, sound):
         raise NotImplementedError  # pragma: no cover
 
@@ -50,18 +257,111 @@ class TranscriptionBase(object):
         except KeyError:
             return default
 
+    def map(self, sounds, default=None, threads=None):
+        """
+        Resolve an iterable of sounds, using `get`.
+
+        :param threads: If specified, resolve the sounds in a pool of `threads` threads. \
+        Since resolving sounds does not modify an instance, this is safe, but instances \
+        should be created before starting the threads.
+        :return: `list` of results in the order of the input.
+        """
+        if not threads or threads < 2:
+            return [self.get(sound, default=default) for sound in sounds]
+
+        from multiprocessing.pool import ThreadPool
+
+        pool = ThreadPool(threads)
+        try:
+            return pool.map(functools.partial(self.get, default=default), sounds)
+        finally:
+            pool.close()
+            pool.join()
+
+    def resolve_many(self, sounds, default=None, index=False, threads=None):
+        """
+        Resolve an iterable of sounds, resolving each distinct item only once.
+
+        :param index: If `True`, return a pair `(indices, table)`, where `table` is the \
+        `list` of results for the distinct items in order of their first occurrence and \
+        `indices` is an `array` mapping each input item to its result in `table`.
+        :param threads: Number of threads used to resolve the distinct items, see `map`.
+        :return: `list` of results in the order of the input.
+        """
+        ids, distinct, indices = {}, [], array('l')
+        for sound in sounds:
+            try:
+                i = ids.get(sound)
+                if i is None:
+                    i = ids[sound] = len(distinct)
+                    distinct.append(sound)
+            except TypeError:  # unhashable symbols are resolved individually
+                i = len(distinct)
+                distinct.append(sound)
+            indices.append(i)
+        table = self.map(distinct, default=default, threads=threads)
+        if index:
+            return indices, table
+        return [table[i] for i in indices]
+
     def __call__(self, sounds, default="0"):
-        return [self.get(x, default=default) for x in sounds.split()]
+        return self.resolve_many(sounds.split(), default=default)
+
+    def translation_table(self, precompute=False):
+        """
+        The table used to translate sounds from other systems into this one.
+
+        :param precompute: Flag signaling whether to add all sounds of this system and \
+        of BIPA to the table, see `TranslationTable.precompute`.
+        :return: `TranslationTable` instance.
+        """
+        table = self.__dict__.get('_translation_table')
+        if table is None:
+            table = self._translation_table = TranslationTable(self)
+        if precompute:
+            table.precompute()
+        return table
 
     def translate(self, string, target_system):
-        return ' '.join('{0}'.format(
-            target_system.get(self[s].name or '?', '?')) for s in string.split())
+        table = target_system.translation_table()
+        return ' '.join(table[self[s].name or '?'] for s in string.split())
 
 
 def pkg_path(*comps):
     return Path(__file__).parent.joinpath(*comps)
 
 
+@contextlib.contextmanager
+def atomic_path(path):
+    """
+    Context manager providing a temporary path to write a file to, which replaces the
+    file at `path` only once writing succeeded. Thus, concurrent readers never see a
+    partially written file and a failure leaves an existing file untouched.
+
+    :param path: Path of the file to write.
+    :return: The temporary path as `str`.
+    """
+    path = str(path)
+    tmp = '{0}.{1}.tmp'.format(path, os.getpid())
+    if os.path.dirname(path) and not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    try:
+        yield tmp
+        getattr(os, 'replace', os.rename)(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def popcount(i):
+    """Count the bits set in an integer."""
+    return bin(i).count('1')
+
+
+if hasattr(int, 'bit_count'):  # pragma: no cover
+    popcount = int.bit_count  # noqa: F811
+
+
 def norm(string):
     return string.replace(EMPTY, "")
 
@@ -0,0 +1,277 @@
+# coding: utf-8
+"""
+A WSGI application to look up sounds in the CLTS data.
+
+Routes:
+
+- `/sound?name=NAME[&dataset=DATASET][&format=json]`: The graphemes mapped to a sound \
+  in the datasets of CLTS, looked up in the indexed store of the data tables (see \
+  `pyclts.db`).
+- `/resolve?grapheme=GRAPHEME[&system=bipa][&format=json]`: Live resolution of a \
+  grapheme in a transcription system.
+- `/batch`: Resolution of a batch of graphemes or names, posted as JSON, see \
+  `App.batch`. The results are streamed as newline-delimited JSON.
+
+Responses of the other routes are HTML, unless JSON is requested with `format=json`.
+The application does not keep per-request state, thus it can be served by
+multi-threaded WSGI servers.
+"""
+from __future__ import unicode_literals
+import json
+import threading
+
+from six import text_type
+from six.moves.urllib.parse import parse_qs
+
+try:
+    from html import escape
+except ImportError:  # pragma: no cover
+    from cgi import escape
+
+from pyclts.transcriptionsystem import TranscriptionSystem
+from pyclts.transcriptiondata import TranscriptionData
+from pyclts.soundclasses import SoundClasses, SOUNDCLASS_SYSTEMS
+
+__all__ = ['App', 'serve']
+
+HTML = """<html>
+<head>
+<meta charset="utf-8">
+<style>th{{background: gray;color:white;}}td {{border:2px solid gray;}}</style>
+</head>
+<body>
+<p>{0}</p>
+<table>
+<tr>{1}</tr>
+{2}
+</table>
+</body>
+</html>"""
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status = status
+
+
+def _html_table(title, header, rows):
+    return HTML.format(
+        title,
+        ''.join('<th>{0}</th>'.format(escape(col)) for col in header),
+        '\n'.join(
+            '<tr>{0}</tr>'.format(''.join(
+                '<td>{0}</td>'.format(escape(text_type(v))) for v in row)) for row in rows))
+
+
+class App(object):
+    """
+    A WSGI application, serving lookups from a CLTS repository.
+    """
+    def __init__(self, repos, systems=('bipa',)):
+        """
+        :param repos: `CLTS` instance.
+        :param systems: IDs of the transcription systems to load on startup, i.e. before \
+        serving requests. Other systems are loaded on first request.
+        """
+        self.db = repos.db
+        self.db.update()
+        self._lock = threading.Lock()
+        # Only known IDs are accepted, since IDs are used to build file paths.
+        self.system_ids = set(repos.transcriptionsystem_ids())
+        self.data_ids = set(repos.transcriptiondata_ids())
+        self.systems = {id_: TranscriptionSystem(id_) for id_ in systems}
+        # Sound class systems and transcription data, loaded on first request:
+        self.targets = {}
+
+    def system(self, id_):
+        try:
+            return self.systems[id_]
+        except KeyError:
+            if id_ not in self.system_ids:
+                raise HTTPError('404 Not Found', 'unknown system: {0}'.format(id_))
+            with self._lock:
+                if id_ not in self.systems:
+                    self.systems[id_] = TranscriptionSystem(id_)
+                return self.systems[id_]
+
+    def target(self, id_):
+        """
+        :return: The transcription system, sound class system or transcription data with \
+        ID `id_`.
+        """
+        if id_ in self.system_ids:
+            return self.system(id_)
+        try:
+            return self.targets[id_]
+        except KeyError:
+            if id_ in SOUNDCLASS_SYSTEMS:
+                cls = SoundClasses
+            elif id_ in self.data_ids:
+                cls = TranscriptionData
+            else:
+                raise HTTPError('404 Not Found', 'unknown system: {0}'.format(id_))
+            # Loaded under the lock, since other threads would see the instance - but
+            # not necessarily its data - as soon as it is created.
+            with self._lock:
+                if id_ not in self.targets:
+                    self.targets[id_] = cls(id_)
+                return self.targets[id_]
+
+    def __call__(self, environ, start_response):
+        params = {
+            k: v[0] for k, v in parse_qs(environ.get('QUERY_STRING', '')).items()}
+        if isinstance(next(iter(params), ''), bytes):  # pragma: no cover
+            params = {k.decode('utf8'): v.decode('utf8') for k, v in params.items()}
+        path = environ.get('PATH_INFO', '/').rstrip('/') or '/sound'
+        try:
+            if path == '/batch':
+                # The response is streamed, thus has no Content-Length:
+                status, content_type, body = '200 OK', 'application/x-ndjson', self.batch(
+                    environ)
+            else:
+                handler = {'/sound': self.sound, '/resolve': self.resolve}.get(path)
+                if not handler:
+                    raise HTTPError('404 Not Found', 'unknown path: {0}'.format(path))
+                status, content_type, body = '200 OK', 'text/html', handler(params)
+                if params.get('format') == 'json' or params.get('plain'):
+                    content_type, body = 'application/json', json.dumps(body[0])
+                else:
+                    body = _html_table(*body[1])
+                body = [body.encode('utf8')]
+        except HTTPError as e:
+            status, content_type, body = e.status, 'text/plain', [text_type(e).encode('utf8')]
+        headers = [('Content-Type', '{0}; charset=utf-8'.format(content_type))]
+        if isinstance(body, list):
+            headers.append(('Content-Length', str(sum(len(chunk) for chunk in body))))
+        start_response(status, headers)
+        return body
+
+    def batch(self, environ):
+        """
+        Resolve a batch of graphemes or names, posted as JSON object with keys `sounds` - \
+        a list of strings - and optionally `systems` - a list of IDs of transcription \
+        systems, sound class systems or transcription data to map the sounds to.
+
+        Each distinct item is resolved only once, in BIPA.
+
+        :return: Generator of lines of newline-delimited JSON, one per item of `sounds`, \
+        with keys `input`, `name`, `bipa`, `valid` and `systems`.
+        """
+        if environ.get('REQUEST_METHOD') != 'POST':
+            raise HTTPError('405 Method Not Allowed', 'Use POST to submit a batch.')
+        try:
+            data = json.loads(environ['wsgi.input'].read(
+                int(environ.get('CONTENT_LENGTH') or 0)).decode('utf8'))
+            sounds, systems = data['sounds'], data.get('systems', [])
+            assert all(isinstance(s, text_type) for s in sounds + systems)
+        except (ValueError, KeyError, TypeError, AssertionError):
+            raise HTTPError(
+                '400 Bad Request', 'Expected a JSON object {"sounds": [...], "systems": [...]}')
+        bipa = self.system('bipa')
+        targets = [(id_, self.target(id_)) for id_ in systems]
+        return self._iter_batch(bipa, targets, sounds)
+
+    def _iter_batch(self, bipa, targets, sounds, chunksize=100):
+        records, lines = {}, []
+        for item in sounds:
+            record = records.get(item)
+            if record is None:
+                try:
+                    sound = bipa[item]
+                except (ValueError, TypeError):
+                    # An invalid name or the name of a sound BIPA cannot generate.
+                    sound = None
+                record = records[item] = self._record(bipa, targets, sound)
+            lines.append(json.dumps(dict(record, input=item)))
+            if len(lines) == chunksize:
+                yield '\n'.join(lines + ['']).encode('utf8')
+                lines = []
+        if lines:
+            yield '\n'.join(lines + ['']).encode('utf8')
+
+    @staticmethod
+    def _record(bipa, targets, sound):
+        if sound is None or sound.type in ['unknownsound', 'marker']:
+            return dict(
+                name=None, bipa=None, valid=False, systems={id_: None for id_, _ in targets})
+        res = dict(name=sound.name, bipa=text_type(sound), valid=bipa.is_valid(sound))
+        res['systems'] = {}
+        for id_, target in targets:
+            value = None
+            # Transcription systems may render sounds they cannot represent with
+            # placeholders, thus we only accept valid sounds.
+            if not hasattr(target, 'is_valid') or target.is_valid(sound.name):
+                try:
+                    value = target.translation_table()[sound.name]
+                except ValueError:
+                    # A sound the target system cannot generate.
+                    pass
+            if value == '?' or (value and ('<?>' in value or '<!>' in value)):
+                value = None
+            res['systems'][id_] = value
+        return res
+
+    def sound(self, params):
+        """
+        :return: Pair of the JSON serializable result and the arguments for an HTML table.
+        """
+        name = params.get('name')
+        if not name:
+            raise HTTPError('400 Bad Request', 'No sound submitted.')
+        name = name.replace('_', ' ')
+        dataset = params.get('dataset') or params.get('dbase') or None
+        sounds = self.db.sounds(name=name)
+        graphemes = self.db.graphemes(name=name, dataset=dataset)
+        header = ['DATASET', 'GRAPHEME', 'EXPLICIT', 'FREQUENCY', 'URL']
+        return (
+            dict(name=name, sound=sounds[0] if sounds else None, graphemes=graphemes),
+            (
+                'Querying CLTS for <i>{0}</i>:'.format(escape(name)),
+                header,
+                [[g[col] for col in header] for g in graphemes]))
+
+    def resolve(self, params):
+        grapheme = params.get('grapheme')
+        if not grapheme:
+            raise HTTPError('400 Bad Request', 'No grapheme submitted.')
+        ts = self.system(params.get('system', 'bipa'))
+        try:
+            sound = ts[grapheme]
+        except (ValueError, TypeError):
+            # The name of a sound the system cannot generate.
+            sound = None
+        res = dict(grapheme=grapheme, system=ts.id)
+        if sound is not None and sound.type != 'unknownsound':
+            res.update(
+                name=sound.name,
+                s=text_type(sound),
+                type=sound.type,
+                generated=sound.generated,
+                normalized=bool(sound.normalized),
+                alias=bool(getattr(sound, 'alias', False)))
+        return res, (
+            'Resolving <i>{0}</i> in {1}:'.format(escape(grapheme), escape(ts.id)),
+            sorted(res),
+            [[res[k] for k in sorted(res)]])
+
+
+def serve(app, host='localhost', port=8000):  # pragma: no cover
+    """
+    Serve the application with a multi-threaded server from the standard library.
+    """
+    from wsgiref.simple_server import make_server, WSGIServer, WSGIRequestHandler
+    from six.moves.socketserver import ThreadingMixIn
+
+    class Server(ThreadingMixIn, WSGIServer):
+        daemon_threads = True
+
+    class Handler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = make_server(host, port, app, server_class=Server, handler_class=Handler)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -1,6 +1,6 @@
 # coding: utf-8
 from __future__ import unicode_literals, print_function, division
-
+import os
 from itertools import groupby
 
 import pytest
@@ -8,6 +8,7 @@ from clldutils.path import Path
 from clldutils.dsv import reader
 
 from pyclts import TranscriptionSystem, TranscriptionData, SoundClasses
+from pyclts.api import CLTS
 
 
 def pytest_generate_tests(metafunc):
@@ -47,6 +48,20 @@ def pytest_generate_tests(metafunc):
         metafunc.parametrize('grapheme,gtype', tests)
 
 
+@pytest.fixture(autouse=True, scope='session')
+def cache_dir(tmpdir_factory):
+    """
+    Keep snapshots and dump slices written by the tests out of the user cache directory.
+    """
+    old = os.environ.get('PYCLTS_CACHE_DIR')
+    os.environ['PYCLTS_CACHE_DIR'] = str(tmpdir_factory.mktemp('cache'))
+    yield
+    if old is None:
+        del os.environ['PYCLTS_CACHE_DIR']
+    else:
+        os.environ['PYCLTS_CACHE_DIR'] = old
+
+
 @pytest.fixture
 def bipa():
     return TranscriptionSystem('bipa')
@@ -90,3 +105,21 @@ def phoible():
 @pytest.fixture
 def pbase():
     return TranscriptionData('pbase')
+
+
+@pytest.fixture
+def data_repos(tmpdir):
+    tmpdir.join('data').mkdir()
+    tmpdir.join('data', 'sounds.tsv').write_text(
+        'NAME\tTYPE\tGRAPHEME\tUNICODE\tGENERATED\tNOTE\n'
+        'voiceless alveolar stop consonant\tconsonant\tt\t\t\t\n'
+        'unrounded open front vowel\tvowel\ta\t\t\t\n'
+        'rounded close back vowel\tvowel\tu\t\t\t\n', 'utf8')
+    tmpdir.join('data', 'graphemes.tsv').write_text(
+        'GRAPHEME\tNAME\tEXPLICIT\tALIAS\tDATASET\tFREQUENCY\tURL\tFEATURES\tIMAGE\tSOUND'
+        '\tNOTE\n'
+        't\tvoiceless alveolar stop consonant\t+\t\tbipa\t0\t\t\t\t\t\n'
+        't\tvoiceless alveolar stop consonant\t+\t\tphoible\t\t\t\t\t\t\n'
+        'a\tunrounded open front vowel\t+\t\tbipa\t0\t\t\t\t\t\n'
+        'u\trounded close back vowel\t+\t\tbipa\t0\t\t\t\t\t\n', 'utf8')
+    return CLTS(str(tmpdir))
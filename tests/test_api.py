@@ -20,3 +20,16 @@ def test_iter_sources(sources, tmpdir):
     srcs = list(api.iter_sources(type='td'))
     assert len(srcs[0][1]) == 0
     assert srcs[0][0]['NAME'] == 'test'
+
+
+def test_audit(tmpdir):
+    res = CLTS(repos=str(tmpdir)).audit()
+    assert 'phoible' in res
+    assert all(isinstance(v, list) for v in res.values())
+
+
+def test_transcriptionsystem_ids(tmpdir):
+    api = CLTS(repos=str(tmpdir))
+    assert 'bipa' in api.transcriptionsystem_ids()
+    assert '_f1' not in api.transcriptionsystem_ids()
+    assert '_f1' in api.transcriptionsystem_ids(include_private=True)
@@ -1,9 +1,10 @@
 # coding: utf8
 from __future__ import unicode_literals, print_function, division
+import json
 
 from clldutils.path import Path
 
-from pyclts.__main__ import sounds, dump, dstats, stats, table, _make_app_data, features
+from pyclts.__main__ import sounds, dump, dstats, stats, table, _make_app_data, features, normalize
 from pyclts.api import CLTS
 
 
@@ -40,14 +41,35 @@ def test_table(capsys, mocker):
 def test_make_app_data(capsys, mocker, tmpdir):
     tmpdir.join('app').mkdir()
     _make_app_data(mocker.Mock(repos=CLTS(str(tmpdir))), test=True)
-    assert Path(str(tmpdir)).joinpath('app', 'data.js').exists()
+    index = json.loads(tmpdir.join('app', 'data', 'index.json').read_text('utf8'))
+    assert index['normalize'] and index['shards']
+    for fname in index['shards'].values():
+        assert tmpdir.join('app', 'data', fname + '.gz').check()
 
 
 def test_dump(capsys, mocker, tmpdir):
     tmpdir.join('data').mkdir()
-    dump(mocker.Mock(repos=CLTS(str(tmpdir))), test=True)
+    dump(mocker.Mock(repos=CLTS(str(tmpdir)), workers=None), test=True)
     out, err = capsys.readouterr()
     assert Path(str(tmpdir)).joinpath('data', 'graphemes.tsv').exists()
     stats(mocker.Mock(repos=CLTS(str(tmpdir))))
     out, err = capsys.readouterr()
     assert 'Unique graphemes' in out
+
+
+def test_normalize(capsys, mocker, tmpdir):
+    tmpdir.join('words.tsv').write_text(
+        'ID\tSegments\n1\tth o x t a\n2\tth a * t a\n3\n', 'utf8')
+    normalize(mocker.Mock(
+        system='bipa',
+        args=[str(tmpdir.join('words.tsv'))],
+        column='Segments',
+        soundclass='sca',
+        delimiter='\t',
+        workers=None))
+    out, err = capsys.readouterr()
+    out = [line.split('\t') for line in out.splitlines()]
+    assert out[0] == ['ID', 'Segments', 'BIPA', 'SCA']
+    assert out[1][2:] == ['tʰ o x t a', 'T U G T A']
+    assert out[2][2:] == ['tʰ a � t a', 'T A 0 T A']
+    assert out[3] == ['3', '', '']
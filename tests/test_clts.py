@@ -3,7 +3,10 @@ from __future__ import unicode_literals, print_function, division
 from six import text_type
 
 import pytest
+from clldutils.path import Path
+from clldutils.dsv import reader
 
+from pyclts.util import nfd
 from pyclts.models import Marker, UnknownSound, is_valid_sound, Symbol, Sound
 
 
@@ -12,6 +15,18 @@ def test_is_valid_sound(bipa):
     assert is_valid_sound(bipa['ä'], bipa)
 
 
+def test_is_valid(bipa, gld):
+    assert bipa.is_valid('ä') and bipa.is_valid(bipa['ä'])
+    assert bipa.is_valid('voiced bilabial nasal consonant')
+    assert not bipa.is_valid('_')
+    assert not bipa.is_valid('voiceless vowel consonant')
+    assert (bipa['ä'].name, bipa['ä'].s) in bipa._valid
+    assert bipa.audit(['a', '_', 'ä', '_', 'xyz']) == ['_', 'xyz']
+    # Names of sounds a system cannot generate are invalid, too:
+    assert bipa.audit(['a', 'voiced vowel']) == ['voiced vowel']
+    assert not gld.is_valid(bipa['ɛ̆'].name)
+
+
 def test_getitem(bipa):
     s = bipa['a']
     assert bipa[s] == s
@@ -275,3 +290,95 @@ def test_sounds(
             assert sound.stress
         assert sound.name == name
         assert sound.codepoints == codepoints
+
+
+def test_map_threads(bipa):
+    sounds = [row['source'] for row in reader(
+        Path(__file__).parent / 'data' / 'test_data.tsv', delimiter='\t', dicts=True)]
+    bipa.cache.clear()
+    res = bipa.map(sounds, threads=4)
+    assert [s.source for s in res] == [nfd(s) for s in sounds]
+    bipa.cache.clear()
+    assert [s.name for s in res] == [s.name for s in bipa.map(sounds)]
+    # Resolution does not modify the sounds of the system:
+    assert all(s.source is None for s in bipa.sounds.values())
+
+
+@pytest.mark.parametrize(
+    "word,segments,kw",
+    [
+        ('tʰɔxtər', 'tʰ ɔ x t ə r', {}),
+        ('ʰbai', 'ʰb ai', {}),
+        ('ʰbai', 'ʰb a i', dict(diphthongs=False)),
+        ('kʷʰaːi̯n', 'kʷʰ aːi̯ n', {}),
+        ('tsaŋ˧˥', 'ts a ŋ ³⁵', {}),
+        ('ha*t', 'h a * t', {}),
+        ('a i', 'a i', {}),
+        ('akta mba', 'a k t a m b a', {}),
+        ('akta mba', 'a kt a mb a', dict(clusters=True)),
+    ]
+)
+def test_segment(bipa, word, segments, kw):
+    assert ' '.join('{0}'.format(s) for s in bipa.segment(word, **kw)) == segments
+
+
+def test_iter_segments(bipa):
+    res = list(bipa.iter_segments(['ˈtʰa', 'ha*t']))
+    assert res[0][0].stress and res[0][0].name == bipa['tʰ'].name
+    assert res[1][2].type == 'unknownsound'
+
+
+def test_resolve_many(bipa, sca):
+    sounds = 'th o x t a th a x _ t a'.split()
+    res = bipa.resolve_many(sounds)
+    assert [s.name for s in res] == [bipa[s].name for s in sounds]
+    indices, table = bipa.resolve_many(sounds, index=True)
+    assert list(indices) == [0, 1, 2, 3, 4, 0, 4, 2, 5, 3, 4]
+    assert len(table) == 6
+    assert bipa.resolve_many([bipa['_'], bipa['_']])[1].type == 'marker'
+    assert sca.resolve_many(sounds + ['A'], default='0', threads=2)[-2:] == ['A', '0']
+
+
+def test_soundclasses_backoff(bipa, sca):
+    sound = bipa['ʰbʲ']
+    assert sound.name not in sca.data
+    assert sca[sound] == 'P'
+    assert sca._backoff[sound.name] == 'P'
+    with pytest.raises(KeyError):
+        _ = sca['A']
+    assert sca._backoff[None] is None
+
+    sca._backoff.clear()
+    sca.precompute([sound.name, '<NA>', 'very bad feature consonant'])
+    assert sca._backoff[sound.name] == 'P'
+
+
+def test_SoundClasses_encode(sca, dolgo):
+    np = pytest.importorskip('numpy')
+
+    assert sorted(sca.vocabulary.values()) == list(range(1, len(sca.classes) + 1))
+    words = ['th o x t a', ['t', 'A'], '']
+    res = sca.encode(words)
+    assert len(res) == 3 and len(res[2]) == 0
+    assert [sca.vocabulary[c] for c in 'TUGTA'] == list(res[0])
+    assert res[1][1] == 0
+
+    values, offsets = dolgo.encode(words, ragged=True)
+    assert list(offsets) == [0, 5, 7, 7]
+    assert values.dtype == np.int32
+    assert list(values[offsets[1]:offsets[2]]) == list(dolgo.encode(words)[1])
+    assert sca.encode([]) == []
+    assert [list(a) for a in dolgo.encode([], ragged=True)] == [[], [0]]
+
+
+def test_transcriptiondata_graphemes(phoible, bipa):
+    assert phoible.name_from_grapheme('m') == 'voiced bilabial nasal consonant'
+    assert phoible.from_grapheme('m') == bipa['m']
+    with pytest.raises(KeyError):
+        phoible.from_grapheme('xyz')
+    for name in set(phoible.names) - {'<NA>'}:
+        for item in phoible.data[name]:
+            assert phoible.name_from_grapheme(item['grapheme']) == name
+    inventory = phoible.convert_inventory(['m', 'k', 'xyz'])
+    assert [text_type(s) for s in inventory[:2]] == ['m', 'k']
+    assert inventory[2] is None
@@ -0,0 +1,31 @@
+# coding: utf8
+from __future__ import unicode_literals, print_function, division
+
+import pickle
+
+from pyclts.convert import Converter
+
+
+def test_Converter():
+    converter = Converter('bipa', soundclass='dolgo')
+    assert converter.columns == ['BIPA', 'DOLGO']
+    assert converter.convert('th o A') == ['tʰ o �', 'T V 0']
+    assert converter.tokens == 3 and converter.unknown['A'] == 1
+
+
+def test_Converter_workers():
+    rows = [['ID', 'Segments']] + [[str(i), 'th o x t a'] for i in range(20)]
+    rows.append([str(21), 'A'])
+    serial = Converter('bipa')
+    expected = list(serial.convert_rows(rows, 'Segments'))
+    converter = Converter('bipa')
+    assert list(converter.convert_rows(rows, 'Segments', workers=2, chunksize=3)) == expected
+    assert converter.tokens == serial.tokens == 101
+    assert converter.unknown == serial.unknown
+
+
+def test_pickle(bipa):
+    sound = bipa['dʱʷ']
+    assert pickle.loads(pickle.dumps(bipa)) is bipa
+    assert pickle.loads(pickle.dumps(sound)).ts is bipa
+    assert len(pickle.dumps(sound)) < 1000
@@ -0,0 +1,31 @@
+# coding: utf8
+from __future__ import unicode_literals, print_function, division
+import threading
+
+
+def test_Database(data_repos, tmpdir):
+    db = data_repos.db
+    assert db.stats() == dict(
+        graphemes=3,
+        sounds=3,
+        singletons=2,
+        multiples=1,
+        types=[('vowel', 2), ('consonant', 1)])
+    assert db.datasets('t') == ['bipa', 'phoible']
+    assert db.datasets() == ['bipa', 'phoible']
+    assert db.names('t') == ['voiceless alveolar stop consonant']
+    assert len(db.graphemes(dataset='bipa')) == 3
+    assert db.graphemes(grapheme='t', dataset='phoible')[0]['FREQUENCY'] == ''
+    assert db.sounds(type='vowel', grapheme='u')[0]['NAME'] == 'rounded close back vowel'
+    assert not db.update()
+
+    res = []
+    t = threading.Thread(target=lambda: res.append(db.connection))
+    t.start()
+    t.join()
+    assert res[0] is not db.connection
+
+    tmpdir.join('data', 'sounds.tsv').write_text(
+        'NAME\tTYPE\tGRAPHEME\tUNICODE\tGENERATED\tNOTE\n', 'utf8')
+    assert db.update()
+    assert db.stats()['sounds'] == 0
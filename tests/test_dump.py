@@ -0,0 +1,55 @@
+# coding: utf-8
+from __future__ import unicode_literals, print_function, division
+
+import pytest
+from clldutils.jsonlib import load
+
+from pyclts.api import CLTS
+from pyclts.dump import Dump
+
+
+def test_Dump(tmpdir, mocker):
+    tmpdir.join('data').mkdir()
+    cache = tmpdir.join('cache')
+    d = Dump(CLTS(str(tmpdir)), directory=str(cache))
+    d.write(test=True)
+    assert len(d.computed) == len(d.manifest) == 4
+    assert load(str(cache.join('manifest.json'))) == d.manifest
+    graphemes = tmpdir.join('data', 'graphemes.tsv').read_text('utf8')
+
+    d.write(test=True)
+    assert not d.computed
+    assert tmpdir.join('data', 'graphemes.tsv').read_text('utf8') == graphemes
+
+    # A changed input invalidates the slice:
+    mocker.patch('pyclts.dump.snapshot.system_hash', lambda id_: id_)
+    list(d.iter_rows(test=True))
+    assert len(d.computed) == 4
+    assert 'voiceless alveolar stop consonant' in d.sounds
+    assert len(cache.listdir()) == 5
+
+    # So does a change of the code computing the slices:
+    mocker.patch('pyclts.dump.MODULES', ['dump.py'])
+    list(d.iter_rows(test=True))
+    assert len(d.computed) == 4
+
+    # A failure while dumping leaves the tables untouched:
+    mocker.patch('pyclts.dump.td_slice', mocker.Mock(side_effect=ValueError))
+    d = Dump(CLTS(str(tmpdir)), directory=str(tmpdir.join('cache3')))
+    with pytest.raises(ValueError):
+        d.write(test=True)
+    assert tmpdir.join('data', 'graphemes.tsv').read_text('utf8') == graphemes
+    assert sorted(f.basename for f in tmpdir.join('data').listdir()) == [
+        'graphemes.tsv', 'sounds.tsv']
+
+
+def test_Dump_workers(tmpdir):
+    tmpdir.join('data').mkdir()
+    d = Dump(CLTS(str(tmpdir)), directory=str(tmpdir.join('cache')))
+    rows = list(d.iter_rows(test=True))
+
+    d2 = Dump(CLTS(str(tmpdir)), directory=str(tmpdir.join('cache2')))
+    rows2 = list(d2.iter_rows(test=True, workers=2))
+    assert len(d2.computed) == 4
+    assert d.sounds == d2.sounds
+    assert rows and rows == rows2
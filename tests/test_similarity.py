@@ -0,0 +1,31 @@
+# coding: utf8
+from __future__ import unicode_literals, print_function, division
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from pyclts.similarity import FeatureMatrix  # noqa: E402
+
+
+def test_FeatureMatrix(bipa, asjp):
+    sounds = [bipa[s] for s in ['t', 'd', 'a', 'dʱʷ', 'ai']]
+    matrix = FeatureMatrix(sounds)
+    assert len(matrix) == 5
+    sim = matrix.similarity()
+    for i, s1 in enumerate(sounds):
+        for j, s2 in enumerate(sounds):
+            assert sim[i, j] == pytest.approx(s1.similarity(s2))
+    assert np.allclose(matrix.similarities(asjp['t']), sim[0])
+    assert matrix.nearest(bipa['t'], k=1)[0][0].name == bipa['d'].name
+
+
+def test_FeatureMatrix_from_system(bipa):
+    matrix = FeatureMatrix.from_system(bipa)
+    sim = matrix.similarity()
+    assert sim.shape == (len(matrix), len(matrix))
+    assert np.allclose(np.diag(sim), 1)
+    nearest = matrix.nearest(bipa['kʷʰ'], k=3)
+    assert len(nearest) == 3
+    assert all(s.name != bipa['kʷʰ'].name for s, _ in nearest)
+    assert nearest[0][1] >= nearest[1][1] >= nearest[2][1]
@@ -1,9 +1,11 @@
 # coding: utf8
 from __future__ import unicode_literals, print_function, division
+import os
 
 import pytest
 
 from pyclts.transcriptionsystem import TranscriptionSystem
+from pyclts.util import LRUCache, ParseStats
 
 
 def test_ts():
@@ -17,3 +19,130 @@ def test_ts():
         TranscriptionSystem('_f3')
     with pytest.raises(ValueError):
         _ = TranscriptionSystem('what')
+
+
+def test_snapshot(tmpdir):
+    from pyclts import snapshot
+
+    bipa = TranscriptionSystem('bipa')
+    path = snapshot.dump(bipa, directory=str(tmpdir))
+    assert path
+
+    ts = object.__new__(TranscriptionSystem)
+    ts.id = 'bipa'
+    assert snapshot.load(ts, directory=str(tmpdir))
+    assert set(ts.sounds) == set(bipa.sounds)
+    assert all(s.ts is ts for s in ts.sounds.values())
+    ts._update_trie()
+    ts.cache, ts.stats = LRUCache(), ParseStats()
+    assert ts['dʱʷ'].name == bipa['dʱʷ'].name
+
+    # A snapshot is only used if the hash of the data files matches:
+    ts = object.__new__(TranscriptionSystem)
+    ts.id = 'asjpcode'
+    assert not snapshot.load(ts, directory=str(tmpdir))
+    tmpdir.join('bipa.pickle').rename(tmpdir.join('asjpcode.pickle'))
+    assert not snapshot.load(ts, directory=str(tmpdir))
+
+
+def test_snapshot_code_hash(mocker):
+    from pyclts import snapshot
+
+    # Snapshots are invalidated by changes of the code, too:
+    h = snapshot.system_hash('bipa')
+    mocker.patch('pyclts.snapshot.MODULES', ['models.py'])
+    assert snapshot.system_hash('bipa') != h
+
+
+def test_snapshot_cache_dir(monkeypatch):
+    from pyclts import snapshot
+
+    monkeypatch.setenv('PYCLTS_CACHE_DIR', '')
+    assert snapshot.cache_dir() is None
+    assert snapshot.dump(TranscriptionSystem('bipa')) is None
+    monkeypatch.setenv('PYCLTS_CACHE_DIR', 'cache')
+    assert snapshot.snapshot_path('bipa') == os.path.join('cache', 'snapshots', 'bipa.pickle')
+    # Snapshots of systems given as path are written to the cache directory, too:
+    paths = [snapshot.snapshot_path(id_) for id_ in ['/tmp/bipa', '../bipa', '../../bipa']]
+    assert all(os.path.dirname(p) == os.path.join('cache', 'snapshots') for p in paths)
+    assert len(set(paths)) == 3
+
+
+def test_resolution_cache():
+    bipa = TranscriptionSystem('bipa')
+    bipa.cache.clear()
+    s1 = bipa['dʱʷ']
+    assert bipa.cache.stats['misses'] == 1
+    assert bipa['dʱʷ'] is s1
+    assert bipa.cache.stats['hits'] == 1
+    assert bipa['labialized breathy voiced alveolar stop consonant'].name == s1.name
+    assert 'labialized breathy voiced alveolar stop consonant' in bipa.cache
+
+
+def test_bitmask():
+    bipa = TranscriptionSystem('bipa')
+    sound = bipa['dʱʷ']
+    assert bipa.feature_values(sound.featurebits) == sound.featureset
+    # Sounds with the same features share one featureset:
+    assert bipa._parse('tʰ').featureset is bipa._parse('tʰ').featureset
+    assert bipa.bitmask(['voiced', 'unknown feature']) is None
+    assert sound.similarity(sound) == 1
+    assert 0 < bipa['t'].similarity(bipa['d']) == bipa['t'].similarity(
+        TranscriptionSystem('asjpcode')['d']) < 1
+
+
+def test_stats():
+    bipa = TranscriptionSystem('bipa')
+    assert not bipa.stats.enabled
+    bipa._parse('a')
+    assert not bipa.stats.counts
+
+    bipa.stats.enable()
+    try:
+        for s in ['a', 'a:', 'tʰʷ', 'ai', 'tk', 'x_', '_ʷ', 'ä̈']:
+            bipa._parse(s)
+        bipa._from_name('voiced bilabial nasal consonant')
+        bipa._from_name('pre-aspirated voiced bilabial nasal consonant')
+        with pytest.raises(ValueError):
+            bipa._from_name('voiceless vowel consonant')
+        stats = bipa.stats.as_dict()
+        for key in [
+            '_parse:direct',
+            '_parse:normalized',
+            '_parse:diacritics',
+            '_parse:split',
+            '_parse:unknown',
+            '_parse:marker',
+            '_from_name:direct',
+            '_from_name:generated',
+            '_from_name:error',
+        ]:
+            assert stats[key]['count'] >= 1, key
+            assert sum(stats[key]['histogram']) == stats[key]['count']
+        # Parsing a diphthong parses its parts:
+        assert stats['_parse:direct']['count'] >= 3
+        assert ('_from_name', 'error') in [row[:2] for row in bipa.stats.table()]
+
+        # Lookups answered from the cache are counted, too:
+        bipa.stats.reset()
+        bipa.cache.clear()
+        for s in ['tʰʷ', 'aːi', 'tʰʷ']:
+            _ = bipa[s]
+        stats = bipa.stats.as_dict()
+        assert stats['resolve_sound:cache']['count'] == 1
+        assert stats['_parse:direct']['count'] == 3
+    finally:
+        bipa.stats.disable()
+        bipa.stats.reset()
+    assert bipa in TranscriptionSystem.instances()
+
+
+def test_direct_hit_copies():
+    bipa = TranscriptionSystem('bipa')
+    canonical = bipa.sounds['tʰ']
+    sound = bipa._parse('tʰ')
+    assert sound is not canonical and sound == canonical
+    # Copies share the values computed for the sound of the system:
+    assert sound.__dict__['name'] == canonical.name
+    assert str(sound) == 'tʰ' and sound.source == 'tʰ' and not sound.normalized
+    assert canonical.source is None
@@ -0,0 +1,39 @@
+# coding: utf8
+from __future__ import unicode_literals, print_function, division
+
+import pytest
+
+from pyclts.translation import TranslationTable
+
+
+def test_translation_table(bipa, asjp, tmpdir):
+    table = asjp.translation_table()
+    assert table is asjp.translation_table()
+    assert bipa.translate('ts a', asjp) == 'c E'
+    assert bipa['ts'].name in table
+
+    table = TranslationTable(asjp).precompute()
+    assert len(table) > len(asjp.sounds) // 2
+    assert all(table[asjp[s].name] == s for s in 'c E N 3'.split())
+
+    table.to_json(str(tmpdir.join('asjp.json')))
+    table2 = TranslationTable.from_json(str(tmpdir.join('asjp.json')))
+    assert table2.mapping == table.mapping
+    assert table2.get('unknown name') is None
+    with pytest.raises(KeyError):
+        _ = table2['unknown name']
+
+
+def test_translation_table_invalid(asjp, gld):
+    # Placeholders for sounds a system cannot represent are not added to the table:
+    for ts in [asjp, gld]:
+        table = TranslationTable(ts).precompute()
+        assert table.mapping
+        assert not [v for v in table.mapping.values() if '<!>' in v or '<?>' in v]
+
+
+def test_translation_table_soundclasses(bipa, sca, phoible):
+    table = TranslationTable(sca).precompute()
+    assert table[bipa['tk'].name] == 'T'
+    assert bipa.translate('tk A', sca) == 'T ?'
+    assert TranslationTable(phoible).precompute()[bipa['m'].name] == 'm'
@@ -1,8 +1,68 @@
 # coding: utf8
 from __future__ import unicode_literals, print_function, division
 
+import pytest
+
 
 def test_TranscriptionBase_translate(bipa, asjp, asjpd):
     assert bipa.translate('ts a', asjp) == 'c E'
     assert asjp.translate('c a', bipa) == 'ts ɐ'
     assert bipa.translate('t o h t a', asjpd)[0] == 't'
+
+
+def test_LRUCache():
+    from pyclts.util import LRUCache
+
+    cache = LRUCache(maxsize=2)
+    assert cache.get('a') is None
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert 'b' not in cache and 'a' in cache
+    assert cache.stats == dict(hits=1, misses=1, evictions=1, size=2, maxsize=2)
+    cache.resize(1)
+    assert len(cache) == 1 and 'c' in cache
+    cache.clear()
+    assert cache.stats == dict(hits=0, misses=0, evictions=0, size=0, maxsize=1)
+
+    cache = LRUCache(maxsize=0)
+    cache.set('a', 1)
+    assert cache.get('a') is None
+
+
+def test_Trie():
+    from pyclts.util import Trie
+
+    trie = Trie(['t', 'ts', 'a'])
+    assert 'ts' in trie and 's' not in trie and '' not in trie
+    assert list(trie.finditer('tsatxa')) == [(0, 2), (2, 3), (3, 4), (5, 6)]
+    assert trie.longest_match('tsa', 1) is None
+    trie.add('tx')
+    assert list(trie.finditer('tsatxa')) == [(0, 2), (2, 3), (3, 5), (5, 6)]
+
+
+def test_popcount():
+    from pyclts.util import popcount
+
+    assert popcount(0) == 0
+    assert popcount(0b10110) == 3
+
+
+def test_atomic_path(tmpdir):
+    from pyclts.util import atomic_path
+
+    path = tmpdir.join('sub', 'file.txt')
+    with atomic_path(path) as tmp:
+        with open(tmp, 'w') as fp:
+            fp.write('a')
+    assert path.read() == 'a'
+
+    with pytest.raises(ValueError):
+        with atomic_path(path) as tmp:
+            with open(tmp, 'w') as fp:
+                fp.write('b')
+            raise ValueError()
+    # A failure leaves the file untouched and removes the temporary file:
+    assert path.read() == 'a'
+    assert tmpdir.join('sub').listdir() == [path]
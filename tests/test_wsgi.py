@@ -0,0 +1,122 @@
+# coding: utf8
+from __future__ import unicode_literals, print_function, division
+import io
+import json
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+
+from pyclts.wsgi import App
+
+
+@pytest.fixture
+def app(data_repos):
+    return App(data_repos)
+
+
+def request(app, path, query=''):
+    environ = {'PATH_INFO': path, 'QUERY_STRING': query}
+    setup_testing_defaults(environ)
+    res = {}
+
+    def start_response(status, headers):
+        res.update(status=status, headers=dict(headers))
+
+    body = b''.join(app(environ, start_response)).decode('utf8')
+    return res['status'], res['headers']['Content-Type'], body
+
+
+def test_sound(app):
+    status, ctype, body = request(
+        app, '/sound', 'name=voiceless_alveolar_stop_consonant&format=json')
+    assert status == '200 OK' and ctype.startswith('application/json')
+    res = json.loads(body)
+    assert res['sound']['GRAPHEME'] == 't'
+    assert [g['DATASET'] for g in res['graphemes']] == ['bipa', 'phoible']
+
+    res = json.loads(request(
+        app, '/sound', 'name=voiceless+alveolar+stop+consonant&dataset=phoible&plain=1')[2])
+    assert len(res['graphemes']) == 1
+
+    status, ctype, body = request(app, '/', 'name=voiceless_alveolar_stop_consonant')
+    assert ctype.startswith('text/html') and '<td>phoible</td>' in body
+
+    # Query parameters are not interpreted as SQL or HTML:
+    status, _, body = request(app, '/sound', 'name=%22+OR+1%3D1+--<b>&format=json')
+    assert json.loads(body)['graphemes'] == []
+    assert '<b>' not in request(app, '/sound', 'name=<b>')[2]
+
+    assert request(app, '/sound')[0].startswith('400')
+    assert request(app, '/xyz')[0].startswith('404')
+
+
+def test_resolve(app):
+    res = json.loads(request(app, '/resolve', 'grapheme=th&format=json')[2])
+    assert res['s'] == 'tʰ' and res['normalized'] is False
+    assert 'name' not in json.loads(request(app, '/resolve', 'grapheme=*&format=json')[2])
+    assert 'aspirated' in request(app, '/resolve', 'grapheme=th&system=bipa')[2]
+    assert request(app, '/resolve', 'grapheme=a&system=xyz')[0].startswith('404')
+    # System IDs are not interpreted as paths:
+    for id_ in ['..', '/tmp', '../transcriptionsystems/bipa', '_f1']:
+        assert request(app, '/resolve', 'grapheme=a&system=' + id_)[0].startswith('404')
+    res = json.loads(request(
+        app, '/resolve',
+        'grapheme=ultra-short+unrounded+open-mid+front+vowel&system=gld&format=json')[2])
+    assert res['system'] == 'gld' and 'name' not in res
+    assert request(app, '/resolve')[0].startswith('400')
+
+
+def post(app, data, method='POST'):
+    body = json.dumps(data).encode('utf8') if not isinstance(data, bytes) else data
+    environ = {
+        'PATH_INFO': '/batch',
+        'REQUEST_METHOD': method,
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body)}
+    setup_testing_defaults(environ)
+    res = {}
+
+    def start_response(status, headers):
+        res.update(status=status, headers=dict(headers))
+
+    chunks = list(app(environ, start_response))
+    return res['status'], res['headers'], b''.join(chunks).decode('utf8')
+
+
+def test_batch(app):
+    sounds = ['th', 'a', 'th', 'voiceless alveolar stop consonant', '*', 'voiceless vowel x']
+    status, headers, body = post(app, dict(sounds=sounds, systems=['asjp', 'sca', 'phoible']))
+    assert status == '200 OK' and 'Content-Length' not in headers
+    res = [json.loads(line) for line in body.splitlines()]
+    assert [r['input'] for r in res] == sounds
+    assert res[0]['bipa'] == 'tʰ' and res[0]['valid']
+    assert res[0]['systems'] == {'asjp': 't', 'sca': 'T', 'phoible': 'tʰ'}
+    assert res[3]['name'] == 'voiceless alveolar stop consonant'
+    assert res[4]['name'] is None and not res[4]['valid']
+    assert res[4]['systems']['sca'] is None
+    assert res[5]['bipa'] is None
+
+    status, _, body = post(app, dict(sounds=['a'] * 250))
+    assert len(body.splitlines()) == 250
+
+    # Names of sounds BIPA cannot generate do not break the stream:
+    status, _, body = post(app, dict(sounds=['a'] * 150 + ['voiced vowel', 'a']))
+    res = [json.loads(line) for line in body.splitlines()]
+    assert len(res) == 152
+    assert res[150]['input'] == 'voiced vowel' and res[150]['name'] is None
+    assert res[151]['bipa'] == 'a'
+
+    assert post(app, dict(sounds=['a'], systems=['xyz']))[0].startswith('404')
+    assert post(app, dict(sounds=['a'], systems=['../README']))[0].startswith('404')
+
+    # Sounds a system cannot represent are mapped to None:
+    status, _, body = post(app, dict(sounds=['t', 'ɛ̆', 'kʷ'], systems=['gld', 'napa']))
+    res = [json.loads(line) for line in body.splitlines()]
+    assert status == '200 OK' and len(res) == 3
+    assert res[0]['systems'] == {'gld': 't', 'napa': 't'}
+    assert res[1]['systems'] == {'gld': None, 'napa': None}
+    assert res[2]['systems'] == {'gld': 'kʷ', 'napa': None}
+    assert app.target('sca') is app.targets['sca']
+    assert post(app, dict(systems=['sca']))[0].startswith('400')
+    assert post(app, b'[')[0].startswith('400')
+    assert post(app, dict(sounds=['a']), method='GET')[0].startswith('405')